@@ -0,0 +1,26 @@
+"""routing_version_seq
+
+Revision ID: 3f1c2a7d9e41
+Revises: 9bd438a8d5c8
+Create Date: 2026-10-18 10:12:31.204117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c2a7d9e41'
+down_revision: Union[str, None] = '9bd438a8d5c8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(sa.schema.CreateSequence(sa.Sequence('routing_version_seq')))
+
+
+def downgrade() -> None:
+    op.execute(sa.schema.DropSequence(sa.Sequence('routing_version_seq')))
@@ -0,0 +1,44 @@
+"""single_active_redirect
+
+Revision ID: d5a7b3e0c918
+Revises: c2e9f1a4b6d3
+Create Date: 2026-10-18 14:21:10.337092
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5a7b3e0c918'
+down_revision: Union[str, None] = 'c2e9f1a4b6d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Оставляем активной только самую свежую ссылку, иначе индекс не создать
+    op.execute(
+        """
+        UPDATE dynamic_payment_urls SET is_active = false
+        WHERE is_active AND id <> (
+            SELECT id FROM dynamic_payment_urls
+            WHERE is_active
+            ORDER BY created_at DESC, id DESC
+            LIMIT 1
+        )
+        """
+    )
+    op.create_index(
+        'uq_dynamic_payment_urls_single_active',
+        'dynamic_payment_urls',
+        ['is_active'],
+        unique=True,
+        postgresql_where=sa.text('is_active'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('uq_dynamic_payment_urls_single_active', table_name='dynamic_payment_urls')
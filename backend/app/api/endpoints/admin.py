@@ -1,20 +1,42 @@
-from datetime import datetime
-from typing import List
-
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-
-from ...core import utils
-from ...db import crud, models
+import csv
+from datetime import datetime, timezone
+import io
+import os
+from typing import List, Literal, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse, StreamingResponse
+import orjson
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...core import balancer, routing, utils
+from ...db import async_crud, queries
 from ...api.schemas.payment_link import (
     APIResponse,
+    DynamicPaymentURLBulkCreate,
     DynamicPaymentURLCreate,
+    DynamicPaymentURLFilter,
     DynamicPaymentURLResponse,
+    RedirectTargetCreate,
+    RedirectTargetResponse,
+)
+from ...api.schemas.workhours import (
+    ScheduleOverrideCreate,
+    ScheduleOverrideResponse,
+    WorkingHoursBulkUpdate,
+    WorkingHoursUpdate,
+    WorkingHoursResponse,
 )
-from ...api.schemas.workhours import WorkingHoursUpdate, WorkingHoursResponse
 from ...core.auth import get_current_admin
 from ...core.config import settings, MOSCOW_TZ
-from ...db.database import get_db
+from ...db.database import (
+    AsyncReadSessionLocal,
+    get_async_db,
+    get_async_read_db,
+    reading_own_writes,
+)
 
 router = APIRouter(prefix="/api/admin", tags=["admin"])
 
@@ -22,15 +44,16 @@ router = APIRouter(prefix="/api/admin", tags=["admin"])
 @router.put("/working-hours", response_model=APIResponse)
 async def update_working_hours(
         hours_data: WorkingHoursUpdate,
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_async_db),
         current_admin: dict = Depends(get_current_admin)
 ):
 
     try:
         datetime.strptime(hours_data.work_start, "%H:%M")
         datetime.strptime(hours_data.work_end, "%H:%M")
+        ZoneInfo(hours_data.timezone)
 
-        updated_hours = crud.update_or_create_working_hours(db, hours_data)
+        updated_hours = await async_crud.update_or_create_working_hours(db, hours_data)
 
         return {
             "success": True,
@@ -42,23 +65,111 @@ async def update_working_hours(
             },
         }
 
+    except ZoneInfoNotFoundError:
+        raise HTTPException(status_code=400, detail="Unknown timezone")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid time format. Use HH:MM")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.put("/working-hours/bulk", response_model=APIResponse)
+async def update_working_hours_bulk(
+        hours_data: WorkingHoursBulkUpdate,
+        db: AsyncSession = Depends(get_async_db),
+        current_admin: dict = Depends(get_current_admin)
+):
+    """Интервалы нескольких дней одним запросом: переданные дни заменяются целиком, одно оповещение"""
+    try:
+        for day in hours_data.days:
+            datetime.strptime(day.work_start, "%H:%M")
+            datetime.strptime(day.work_end, "%H:%M")
+            ZoneInfo(day.timezone)
+    except ZoneInfoNotFoundError:
+        raise HTTPException(status_code=400, detail="Unknown timezone")
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid time format. Use HH:MM")
+
+    try:
+        updated = await async_crud.replace_working_hours(db, hours_data.days)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    return {
+        "success": True,
+        "message": f"Рабочее время обновлено: {len({day.day_of_week for day in updated})} дн.",
+        "data": [WorkingHoursResponse.model_validate(day) for day in updated],
+    }
+
 
 @router.get("/working-hours", response_model=List[WorkingHoursResponse])
 async def get_all_working_hours(
-    db: Session = Depends(get_db), current_admin: dict = Depends(get_current_admin)
+    db: AsyncSession = Depends(get_async_read_db), current_admin: dict = Depends(get_current_admin)
+):
+    return await async_crud.get_all_working_hours(db)
+
+
+@router.get("/schedule-overrides", response_model=List[ScheduleOverrideResponse])
+async def get_schedule_overrides(
+    db: AsyncSession = Depends(get_async_read_db), current_admin: dict = Depends(get_current_admin)
+):
+    return await async_crud.get_schedule_overrides(db)
+
+
+@router.post("/schedule-overrides", response_model=APIResponse)
+async def create_schedule_override(
+        override_data: ScheduleOverrideCreate,
+        db: AsyncSession = Depends(get_async_db),
+        current_admin: dict = Depends(get_current_admin)
+):
+    try:
+        if override_data.is_enabled:
+            if not override_data.work_start or not override_data.work_end:
+                raise HTTPException(
+                    status_code=400, detail="work_start and work_end are required"
+                )
+            datetime.strptime(override_data.work_start, "%H:%M")
+            datetime.strptime(override_data.work_end, "%H:%M")
+        ZoneInfo(override_data.timezone)
+
+        override = await async_crud.create_schedule_override(db, override_data)
+
+        if override.is_enabled:
+            message = f"Особый график на {override.day.strftime('%d.%m.%Y')}: {override.work_start} - {override.work_end}"
+        else:
+            message = f"{override.day.strftime('%d.%m.%Y')} отмечен как нерабочий день"
+
+        return {
+            "success": True,
+            "message": message,
+            "data": ScheduleOverrideResponse.model_validate(override),
+        }
+
+    except HTTPException:
+        raise
+    except ZoneInfoNotFoundError:
+        raise HTTPException(status_code=400, detail="Unknown timezone")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid time format. Use HH:MM")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.delete("/schedule-overrides/{override_id}")
+async def delete_schedule_override(
+        override_id: int,
+        db: AsyncSession = Depends(get_async_db),
+        current_admin: dict = Depends(get_current_admin)
 ):
-    return crud.get_all_working_hours(db)
+    if not await async_crud.delete_schedule_override(db, override_id):
+        raise HTTPException(status_code=404, detail="override does not exist")
+    return {"success": True}
 
 
 @router.post("/dynamic-redirect", response_model=APIResponse)
 async def update_dynamic_redirect(
         url_data: DynamicPaymentURLCreate,
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_async_db),
         current_admin: dict = Depends(get_current_admin),
 ):
     try:
@@ -67,15 +178,21 @@ async def update_dynamic_redirect(
                 status_code=400, detail="valid_from must be before valid_until"
             )
 
-        new_url = crud.create_dynamic_url(db, url_data)
+        new_url = await async_crud.create_dynamic_url(db, url_data)
+
+        if new_url.auto_activate:
+            message = f"Динамический редирект запланирован! Включится автоматически {url_data.valid_from}, действует до {url_data.valid_until}"
+        else:
+            message = f"Динамический редирект обновлён! Действует с {url_data.valid_from} до {url_data.valid_until}"
 
         return {
             "success": True,
-            "message": f"Динамический редирект обновлён! Действует с {url_data.valid_from} до {url_data.valid_until}",
+            "message": message,
             "data": {
                 "id": new_url.id,
                 "gateway_url": f"{settings.PROTOCOL}://{settings.DOMAIN}/pay",
                 "target_url": new_url.target_url,
+                "targets": len(new_url.targets),
             },
         }
 
@@ -85,15 +202,106 @@ async def update_dynamic_redirect(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/dynamic-redirects/bulk", response_model=APIResponse)
+async def create_dynamic_redirects_bulk(
+        urls_data: DynamicPaymentURLBulkCreate,
+        db: AsyncSession = Depends(get_async_db),
+        current_admin: dict = Depends(get_current_admin),
+):
+    """Пакет ссылок одной транзакцией, например расписание на неделю вперёд"""
+    if any(url.valid_from >= url.valid_until for url in urls_data.redirects):
+        raise HTTPException(status_code=400, detail="valid_from must be before valid_until")
+
+    now = datetime.now(timezone.utc)
+    if sum(queries.as_utc(url.valid_from) <= now for url in urls_data.redirects) > 1:
+        raise HTTPException(
+            status_code=400, detail="В пакете может быть только одна ссылка, действующая сейчас"
+        )
+
+    try:
+        created = await async_crud.create_dynamic_urls(db, urls_data.redirects)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return {
+        "success": True,
+        "message": f"Добавлено ссылок: {len(created)}",
+        "data": [
+            {"id": url.id, "is_active": url.is_active, "auto_activate": url.auto_activate}
+            for url in created
+        ],
+    }
+
+
+@router.put("/dynamic-redirect/{redirect_id}/targets", response_model=APIResponse)
+async def replace_redirect_targets(
+        redirect_id: int,
+        targets: List[RedirectTargetCreate],
+        db: AsyncSession = Depends(get_async_db),
+        current_admin: dict = Depends(get_current_admin)
+):
+    redirect = await async_crud.get_dynamic_url(db, redirect_id)
+
+    if not redirect:
+        raise HTTPException(status_code=404, detail="Ссылка не найдена")
+
+    if targets and not any(target.is_enabled for target in targets):
+        raise HTTPException(status_code=400, detail="At least one target must be enabled")
+
+    redirect = await async_crud.replace_redirect_targets(db, redirect, targets)
+
+    return {
+        "success": True,
+        "message": f"Цели обновлены: {len(redirect.targets)}",
+        "data": [RedirectTargetResponse.model_validate(target) for target in redirect.targets],
+    }
+
+
+@router.get("/dynamic-redirect/{redirect_id}/targets/stats")
+async def get_redirect_target_stats(
+        redirect_id: int,
+        since: Optional[datetime] = None,
+        db: AsyncSession = Depends(get_async_read_db),
+        current_admin: dict = Depends(get_current_admin)
+):
+    """Заданные и фактические доли целей: по всем воркерам из payment_sessions и по этому воркеру"""
+    redirect = await async_crud.get_dynamic_url(db, redirect_id)
+
+    if not redirect:
+        raise HTTPException(status_code=404, detail="Ссылка не найдена")
+
+    totals = await async_crud.get_target_hits(db, redirect_id, since)
+    total_hits = sum(count for target_id, count in totals.items() if target_id is not None)
+    total_weight = sum(target.weight for target in redirect.targets if target.is_enabled)
+
+    return {
+        "success": True,
+        "redirect_id": redirect.id,
+        "worker_pid": os.getpid(),
+        "untargeted": totals.get(None, 0),
+        "targets": [
+            {
+                "id": target.id,
+                "target_url": target.target_url,
+                "weight": target.weight,
+                "is_enabled": target.is_enabled,
+                "expected_share": round(target.weight / total_weight, 4) if target.is_enabled and total_weight else 0,
+                "hits": totals.get(target.id, 0),
+                "share": round(totals.get(target.id, 0) / total_hits, 4) if total_hits else 0,
+                "worker_hits": balancer.hits[(redirect.id, target.id)],
+            }
+            for target in redirect.targets
+        ],
+    }
+
+
 @router.patch("/dynamic-redirect/{redirect_id}/toggle")
 async def toggle_redirect_status(
         redirect_id: int,
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_async_db),
         current_admin: dict = Depends(get_current_admin)
 ):
-    redirect = db.query(models.DynamicPaymentURL).filter(
-        models.DynamicPaymentURL.id == redirect_id
-    ).first()
+    redirect = await async_crud.get_dynamic_url(db, redirect_id)
 
     if not redirect:
         raise HTTPException(status_code=404, detail="Ссылка не найдена")
@@ -110,9 +318,7 @@ async def toggle_redirect_status(
         valid_until = valid_until.replace(tzinfo=MOSCOW_TZ)
 
     if redirect.is_active:
-        redirect.is_active = False
-        db.commit()
-        db.refresh(redirect)
+        redirect = await async_crud.toggle_redirect_status(db, redirect)
 
         return {
             "success": True,
@@ -135,11 +341,7 @@ async def toggle_redirect_status(
                 detail=f"Срок действия ссылки истёк: {valid_until.strftime('%d.%m.%Y %H:%M')}"
             )
 
-        db.query(models.DynamicPaymentURL).update({"is_active": False})
-
-        redirect.is_active = True
-        db.commit()
-        db.refresh(redirect)
+        redirect = await async_crud.toggle_redirect_status(db, redirect)
 
         return {
             "success": True,
@@ -153,42 +355,182 @@ async def toggle_redirect_status(
 
 @router.get("/dynamic-redirects", response_model=List[DynamicPaymentURLResponse])
 async def get_all_redirects(
-        db: Session = Depends(get_db),
+        response: Response,
+        limit: int = Query(100, ge=1, le=500),
+        cursor: Optional[str] = None,
+        filters: DynamicPaymentURLFilter = Depends(),
+        db: AsyncSession = Depends(get_async_read_db),
+        current_admin: dict = Depends(get_current_admin)
+):
+    """История от новых к старым; курсор следующей страницы — в заголовке X-Next-Cursor"""
+    try:
+        after = utils.decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Некорректный курсор")
+
+    redirects = await async_crud.get_all_dynamic_urls(db, limit, after, filters)
+
+    if len(redirects) == limit:
+        last = redirects[-1]
+        response.headers["X-Next-Cursor"] = utils.encode_cursor(last.created_at, last.id)
+    return redirects
+
+
+EXPORT_COLUMNS = (
+    "id",
+    "name",
+    "target_url",
+    "valid_from",
+    "valid_until",
+    "is_active",
+    "auto_activate",
+    "created_at",
+    "supports_amount",
+    "amount_parameter",
+)
+
+
+async def _export_rows(filters: DynamicPaymentURLFilter, fmt: str):
+    # Сессия живёт вместе с ответом: строки идут из серверного курсора пачками
+    async with AsyncReadSessionLocal() as db:
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(EXPORT_COLUMNS)
+            yield buffer.getvalue()
+        async for row in async_crud.stream_dynamic_urls(db, filters):
+            values = row._mapping
+            if fmt == "csv":
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerow(
+                    value.isoformat() if isinstance(value, datetime) else value
+                    for value in (values[column] for column in EXPORT_COLUMNS)
+                )
+                yield buffer.getvalue()
+            else:
+                yield orjson.dumps(
+                    {column: values[column] for column in EXPORT_COLUMNS},
+                    option=orjson.OPT_APPEND_NEWLINE,
+                )
+
+
+@router.get("/dynamic-redirects/export")
+async def export_redirects(
+        fmt: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+        filters: DynamicPaymentURLFilter = Depends(),
         current_admin: dict = Depends(get_current_admin)
 ):
-    return crud.get_all_dynamic_urls(db)
+    media_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        _export_rows(filters, fmt),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="redirects.{fmt}"',
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
+def _redirect_summary(dynamic_url) -> dict:
+    return {
+        "id": dynamic_url.id,
+        "gateway_url": f"{settings.PROTOCOL}://{settings.DOMAIN}/pay",
+        "target_url": dynamic_url.target_url,
+        "valid_from": dynamic_url.valid_from.isoformat(),
+        "valid_until": dynamic_url.valid_until.isoformat(),
+        "name": dynamic_url.name,
+        "is_active": dynamic_url.is_active,
+        "created_at": dynamic_url.created_at.isoformat() if hasattr(dynamic_url, 'created_at') else None
+    }
 
 
 @router.get("/current-redirect")
 async def get_current_redirect(
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_async_read_db),
         current_admin: dict = Depends(get_current_admin)
 ):
-    dynamic_url = crud.get_active_dynamic_url(db)
+    dynamic_url = await async_crud.get_active_dynamic_url(db)
 
     if not dynamic_url:
         return {"success": False, "error": "No active redirect configured"}
 
-    return {
-        "success": True,
-        "redirect": {
-            "id": dynamic_url.id,
-            "gateway_url": f"{settings.PROTOCOL}://{settings.DOMAIN}/pay",
-            "target_url": dynamic_url.target_url,
-            "valid_from": dynamic_url.valid_from.isoformat(),
-            "valid_until": dynamic_url.valid_until.isoformat(),
-            "name": dynamic_url.name,
-            "is_active": dynamic_url.is_active,
-            "created_at": dynamic_url.created_at.isoformat() if hasattr(dynamic_url, 'created_at') else None
-        },
-    }
+    return {"success": True, "redirect": _redirect_summary(dynamic_url)}
+
+
+def _dashboard_active(redirects, now: datetime):
+    """Действующая из активных ссылок - по тому же правилу, что и get_active_dynamic_url.
+
+    Оба пути дашборда выбирают её из строк is_active одной версии: 304 - из
+    снапшота воркера, полный ответ - из БД, поэтому ETag у них совпадает.
+    """
+    for redirect in redirects:
+        if queries.as_utc(redirect.valid_from) <= now <= queries.as_utc(redirect.valid_until):
+            return redirect
+    return None
+
+
+def _dashboard_etag(version: int, active, limit: int) -> str:
+    return f'"dashboard-{version}-{active.id if active else 0}-{limit}"'
+
+
+@router.get("/dashboard")
+async def get_dashboard(
+        request: Request,
+        limit: int = Query(100, ge=1, le=500),
+        if_none_match: Optional[str] = Header(None),
+        db: AsyncSession = Depends(get_async_read_db),
+        current_admin: dict = Depends(get_current_admin)
+):
+    """Текущая ссылка, первая страница истории и рабочие часы одним запросом.
+
+    Любая правка этих данных двигает версию маршрутизации, поэтому совпавший
+    ETag проверяется по снапшоту воркера и отвечает 304 без обращения к БД.
+    """
+    headers = {"Cache-Control": "private, no-cache"}
+
+    # Сразу после своей правки снапшот этого воркера может ещё не получить NOTIFY
+    if if_none_match and not reading_own_writes(request):
+        try:
+            snapshot = routing.get_snapshot()
+            active = _dashboard_active(snapshot.redirects, datetime.now(timezone.utc))
+            etag = _dashboard_etag(snapshot.version, active, limit)
+            if utils.etag_matches(if_none_match, etag):
+                return Response(status_code=304, headers={**headers, "ETag": etag})
+        except RuntimeError:
+            pass
+
+    version = await async_crud.get_routing_version(db)
+    dynamic_url = _dashboard_active(
+        await async_crud.get_active_dynamic_urls(db), datetime.now(timezone.utc)
+    )
+    redirects = await async_crud.get_all_dynamic_urls(db, limit)
+    working_hours = await async_crud.get_all_working_hours(db)
+
+    next_cursor = None
+    if len(redirects) == limit:
+        next_cursor = utils.encode_cursor(redirects[-1].created_at, redirects[-1].id)
+
+    headers["ETag"] = _dashboard_etag(version, dynamic_url, limit)
+    return ORJSONResponse(
+        jsonable_encoder(
+            {
+                "current_redirect": _redirect_summary(dynamic_url) if dynamic_url else None,
+                "redirects": [DynamicPaymentURLResponse.model_validate(url) for url in redirects],
+                "next_cursor": next_cursor,
+                "working_hours": [WorkingHoursResponse.model_validate(day) for day in working_hours],
+            }
+        ),
+        headers=headers,
+    )
+
 
 @router.delete("/{redirect_id}")
 async def delete_redirect(
         redirect_id: int,
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_async_db),
         current_admin: dict = Depends(get_current_admin)):
-    redirect = crud.delete_dynamic_url(db, redirect_id)
+    redirect = await async_crud.delete_dynamic_url(db, redirect_id)
     if not redirect:
         raise HTTPException(status_code=404, detail="redirect does not exist")
     return {"success": True}
\ No newline at end of file
@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import HTTPBearer, OAuth2PasswordRequestForm
 from starlette import status
 
-from ...core.auth import get_current_admin, create_access_token, verify_password
+from ...core.auth import get_current_admin, create_access_token, verify_password_async
 from ...core.config import settings
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
@@ -13,7 +13,7 @@ security = HTTPBearer()
 @router.post("/login")
 async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     if form_data.username == settings.ADMIN_USERNAME:
-        if verify_password(form_data.password, settings.ADMIN_PASSWORD):
+        if await verify_password_async(form_data.password, settings.ADMIN_PASSWORD):
             token = create_access_token(data={"sub": form_data.username})
             return {"access_token": token, "token_type": "bearer"}
     raise HTTPException(
@@ -1,68 +1,259 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-import uuid
+from datetime import datetime, timezone
+import hashlib
+from typing import Literal, Optional
 
-from ...core import utils, config
-from ...db import crud
-from ...db.database import get_db
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+import orjson
+
+from ...core import metrics, qr, responses, routing, session_token, timing
+from ...core.broadcaster import broadcaster
+from ...core.config import settings
+from ...core.session_buffer import buffer as session_buffer
+from ...core.utils import etag_matches
 
 router = APIRouter(prefix="/api", tags=["payment"])
 
 
+def json_bytes(
+    body: bytes, status_code: int = 200, headers: Optional[dict] = None
+) -> Response:
+    return Response(body, status_code=status_code, media_type="application/json", headers=headers)
+
+
 @router.get("/generate-qr")
-async def generate_qr(db: Session = Depends(get_db)):
+async def generate_qr():
     try:
-        is_working, message = utils.is_working_hours(db, config.MOSCOW_TZ)
+        snapshot = routing.get_snapshot()
+        is_working, message = snapshot.schedule.status()
 
         if not is_working:
-            return {"success": False, "error": "closed", "message": message}
+            metrics.record_outcome("generate_qr", "closed")
+            return json_bytes(responses.error_body("closed", message))
 
-        dynamic_url = crud.get_active_dynamic_url(db)
+        dynamic_url = routing.current_redirect()
 
         if not dynamic_url:
-            return {
-                "success": False,
-                "error": "maintenance",
-                "message": "Платежная система временно недоступна",
-            }
+            metrics.record_outcome("generate_qr", "maintenance")
+            return json_bytes(
+                responses.error_body("maintenance", "Платежная система временно недоступна")
+            )
 
-        session_id = str(uuid.uuid4())
-        url = dynamic_url.target_url
+        session_id = session_token.issue(dynamic_url.id)
+        session_buffer.add(session_id, "qr", dynamic_url.id)
 
-        return {
-            "success": True,
-            "qr_code": {"url": url, "session_id": session_id},
-            "message": "QR код сгенерирован",
-        }
+        metrics.record_outcome("generate_qr", "success")
+        with timing.phase("encode"):
+            responses.remember("/api/generate-qr", responses.QR_TEMPLATE, dynamic_url.id)
+            return json_bytes(responses.QR_TEMPLATE.render(session_id))
     except Exception as e:
-        return {"success": False, "error": "server_error", "message": str(e)}
+        metrics.record_outcome("generate_qr", "server_error")
+        return json_bytes(responses.error_body("server_error", str(e)))
 
 
 @router.get("/payment-link")
-async def get_payment_link(db: Session = Depends(get_db)):
+async def get_payment_link():
     try:
-        is_working, message = utils.is_working_hours(db, config.MOSCOW_TZ)
+        snapshot = routing.get_snapshot()
+        is_working, message = snapshot.schedule.status()
 
         if not is_working:
-            return {"success": False, "error": "closed", "message": message}
+            metrics.record_outcome("payment_link", "closed")
+            return json_bytes(responses.error_body("closed", message))
 
-        dynamic_url = crud.get_active_dynamic_url(db)
+        dynamic_url = routing.current_redirect()
 
         if not dynamic_url:
-            return {
-                "success": False,
-                "error": "maintenance",
-                "message": "Платежная система временно недоступна",
-            }
+            metrics.record_outcome("payment_link", "maintenance")
+            return json_bytes(
+                responses.error_body("maintenance", "Платежная система временно недоступна")
+            )
+
+        session_id = session_token.issue(dynamic_url.id)
+        target = dynamic_url.choose()
+        link = dynamic_url.url_for(target=target)
+        session_buffer.add(session_id, "link", dynamic_url.id, target_id=target.id)
+
+        metrics.record_outcome("payment_link", "success")
+        with timing.phase("encode"):
+            template = responses.link_template(link)
+            responses.remember("/api/payment-link", template, dynamic_url.id)
+            return json_bytes(template.render(session_id))
+    except Exception as e:
+        metrics.record_outcome("payment_link", "server_error")
+        return json_bytes(responses.error_body("server_error", str(e)))
+
+
+@router.get("/payment-status")
+async def get_payment_status(if_none_match: Optional[str] = Header(None)):
+    """Общая часть ответа без session_id: кешируется до ближайшей смены состояния.
+
+    Ссылку и QR с сессией клиент собирает из session_id от /api/session.
+    """
+    try:
+        snapshot = routing.get_snapshot()
+    except RuntimeError as e:
+        metrics.record_outcome("payment_status", "server_error")
+        return json_bytes(
+            responses.error_body("server_error", str(e)), headers={"Cache-Control": "no-store"}
+        )
+
+    now = datetime.now(timezone.utc)
+    is_working, message = snapshot.schedule.status(now)
+    dynamic_url = snapshot.active_redirect(now)
+
+    with timing.phase("encode"):
+        if not is_working:
+            outcome, body = "closed", responses.error_body("closed", message)
+        elif not dynamic_url:
+            outcome, body = "maintenance", responses.error_body(
+                "maintenance", "Платежная система временно недоступна"
+            )
+        else:
+            outcome, body = "success", orjson.dumps({"success": True, "link": responses.PAY_URL})
+
+    metrics.record_outcome("payment_status", outcome)
+
+    max_age = settings.PAYMENT_STATUS_MAX_AGE
+    change = snapshot.next_change(now)
+    if change is not None:
+        max_age = min(max_age, int((change - now).total_seconds()))
+
+    state = hashlib.sha256(repr((is_working, message)).encode()).hexdigest()[:8]
+    etag = f'"{dynamic_url.id if dynamic_url else 0}-{snapshot.version}-{state}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={max_age}" if max_age > 0 else "no-cache",
+    }
+
+    responses.remember("/api/payment-status", body)
+
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    return Response(body, media_type="application/json", headers=headers)
+
+
+@router.post("/session")
+async def create_session(kind: Literal["link", "qr"] = "link"):
+    """Дешёвая некешируемая выдача session_id к закешированному статусу"""
+    headers = {"Cache-Control": "no-store"}
+    try:
+        dynamic_url = routing.current_redirect()
+    except RuntimeError as e:
+        metrics.record_outcome("session", "server_error")
+        return json_bytes(responses.error_body("server_error", str(e)), headers=headers)
 
-        session_id = str(uuid.uuid4())
-        link = dynamic_url.target_url
+    if not dynamic_url:
+        metrics.record_outcome("session", "maintenance")
+        return json_bytes(
+            responses.error_body("maintenance", "Платежная система временно недоступна"),
+            headers=headers,
+        )
 
-        return {
+    session_id = session_token.issue(dynamic_url.id)
+    session_buffer.add(session_id, kind, dynamic_url.id)
+    responses.remember("/api/session", responses.SESSION_TEMPLATE, dynamic_url.id)
+
+    metrics.record_outcome("session", "success")
+    return ORJSONResponse({"success": True, "session_id": session_id}, headers=headers)
+
+
+@router.get("/session/{session_id}")
+async def check_session(session_id: str):
+    """Проверка session_id по подписи, без БД: срок, ссылка и сумма зашиты в сам id"""
+    headers = {"Cache-Control": "no-store"}
+    try:
+        claims = session_token.verify(session_id)
+    except session_token.TokenExpired:
+        return json_bytes(
+            responses.error_body("expired", "Сессия истекла, обновите страницу"), 410, headers
+        )
+    except ValueError:
+        return json_bytes(
+            responses.error_body("invalid_session", "Некорректная сессия"), 400, headers
+        )
+
+    return ORJSONResponse(
+        {
             "success": True,
             "session_id": session_id,
-            "link": link,
-            "message": "Ссылка создана",
-        }
+            "redirect_id": claims.redirect_id or None,
+            "amount": claims.amount,
+            "issued_at": datetime.fromtimestamp(claims.issued_at, timezone.utc),
+            "expires_at": datetime.fromtimestamp(claims.expires_at, timezone.utc),
+        },
+        headers=headers,
+    )
+
+
+@router.get("/payment-events")
+async def payment_events():
+    """SSE: состояние платёжной страницы, отправляется только при изменении"""
+    return StreamingResponse(
+        broadcaster.stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/qr-code.{fmt}")
+async def get_qr_image(
+    fmt: Literal["png", "svg"],
+    session: str,
+    size: int = qr.DEFAULT_SIZE,
+    if_none_match: Optional[str] = Header(None),
+):
+    """QR той же ссылки /pay?session=..., что отдаёт generate-qr"""
+    if size not in qr.SIZES:
+        raise HTTPException(status_code=400, detail=f"size must be one of {qr.SIZES}")
+
+    try:
+        claims = session_token.verify(session)
+    except session_token.TokenExpired:
+        metrics.record_outcome("qr_image", "expired")
+        return json_bytes(
+            responses.error_body("expired", "Сессия истекла, обновите страницу"), 410
+        )
+    except ValueError:
+        metrics.record_outcome("qr_image", "invalid_session")
+        return json_bytes(responses.error_body("invalid_session", "Некорректная сессия"), 400)
+
+    try:
+        snapshot = routing.get_snapshot()
+        is_working, message = snapshot.schedule.status()
+
+        if not is_working:
+            metrics.record_outcome("qr_image", "closed")
+            return json_bytes(responses.error_body("closed", message), 503)
+
+        dynamic_url = routing.current_redirect()
+
+        if not dynamic_url:
+            metrics.record_outcome("qr_image", "maintenance")
+            return json_bytes(
+                responses.error_body("maintenance", "Платежная система временно недоступна"), 503
+            )
+
+        if claims.redirect_id != dynamic_url.id:
+            metrics.record_outcome("qr_image", "expired")
+            return json_bytes(
+                responses.error_body("expired", "Реквизиты изменились, обновите страницу"), 410
+            )
+
+        url = responses.pay_url(session)
+        image = qr.cache.get(url, fmt, size) or await run_in_threadpool(
+            qr.cache.render, url, fmt, size
+        )
     except Exception as e:
-        return {"success": False, "error": "server_error", "message": str(e)}
\ No newline at end of file
+        metrics.record_outcome("qr_image", "server_error")
+        return json_bytes(responses.error_body("server_error", str(e)), 503)
+
+    headers = {"ETag": image.etag, "Cache-Control": "no-cache"}
+    metrics.record_outcome("qr_image", "success")
+
+    if etag_matches(if_none_match, image.etag):
+        return Response(status_code=304, headers=headers)
+
+    return Response(image.content, media_type=image.media_type, headers=headers)
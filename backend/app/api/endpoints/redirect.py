@@ -0,0 +1,66 @@
+from decimal import Decimal
+from typing import Optional
+from urllib.parse import urlencode
+
+from fastapi import APIRouter, Query
+from fastapi.responses import RedirectResponse
+from pydantic import condecimal
+
+from ...core import metrics, routing, session_token
+from ...core.config import settings
+from ...core.session_buffer import buffer as session_buffer
+
+router = APIRouter(tags=["redirect"])
+
+# Пределы колонки payment_sessions.amount Numeric(12, 2)
+MAX_AMOUNT = Decimal("9999999999.99")
+Amount = condecimal(gt=0, le=MAX_AMOUNT, decimal_places=2)
+
+
+def error_redirect(error: str, message: str) -> RedirectResponse:
+    metrics.record_outcome("pay", error)
+    query = urlencode({"type": error, "message": message})
+    return RedirectResponse(f"{settings.FRONTEND_URL}/payment-error?{query}", status_code=302)
+
+
+@router.get("/pay")
+async def pay(
+    amount: Optional[Amount] = Query(None),
+    session: Optional[str] = None,
+):
+    # Сессия со страницы оплаты: просроченную отклоняем, сумма из неё — по умолчанию
+    claims = None
+    if session is not None:
+        try:
+            claims = session_token.verify(session)
+        except session_token.TokenExpired:
+            return error_redirect("expired", "Сессия истекла, обновите страницу")
+        except ValueError:
+            return error_redirect("error", "Некорректная сессия")
+        amount = amount or claims.amount
+
+    try:
+        snapshot = routing.get_snapshot()
+    except RuntimeError:
+        return error_redirect("server_error", "Платежная система временно недоступна")
+
+    is_working, message = snapshot.schedule.status()
+
+    if not is_working:
+        return error_redirect("closed", message)
+
+    dynamic_url = routing.current_redirect()
+
+    if not dynamic_url:
+        return error_redirect("maintenance", "Платежная система временно недоступна")
+
+    # Сессия выдана под другие реквизиты: платить по ним уже нельзя
+    if claims is not None and claims.redirect_id != dynamic_url.id:
+        return error_redirect("expired", "Реквизиты изменились, обновите страницу")
+
+    target = dynamic_url.choose()
+    metrics.record_outcome("pay", "success")
+    session_id = session if claims is not None else session_token.issue(dynamic_url.id, amount)
+    session_buffer.add(session_id, "redirect", dynamic_url.id, amount, target.id)
+
+    return RedirectResponse(dynamic_url.url_for(amount, target), status_code=302)
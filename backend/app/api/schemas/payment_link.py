@@ -1,6 +1,18 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional, Any
+from typing import List, Optional, Any
+
+
+class RedirectTargetCreate(BaseModel):
+    target_url: str = Field(..., min_length=10, max_length=500)
+    weight: int = Field(1, ge=1, le=10000)
+    is_enabled: bool = True
+
+
+class RedirectTargetResponse(RedirectTargetCreate):
+    id: int
+    class Config:
+        from_attributes = True
 
 
 class DynamicPaymentURLCreate(BaseModel):
@@ -8,6 +20,15 @@ class DynamicPaymentURLCreate(BaseModel):
     target_url: str = Field(..., min_length=10, max_length=500)
     valid_from: datetime
     valid_until: datetime
+    supports_amount: bool = True
+    amount_parameter: str = Field("sum", min_length=1, max_length=20)
+    # Вес основной ссылки, если трафик делится с дополнительными целями
+    weight: int = Field(1, ge=1, le=10000)
+    targets: List[RedirectTargetCreate] = []
+
+class DynamicPaymentURLBulkCreate(BaseModel):
+    redirects: List[DynamicPaymentURLCreate] = Field(..., min_length=1, max_length=500)
+
 
 class DynamicPaymentURLResponse(BaseModel):
     id: int
@@ -17,10 +38,22 @@ class DynamicPaymentURLResponse(BaseModel):
     valid_until: datetime
     is_active: bool
     created_at: datetime
+    auto_activate: bool = False
+    supports_amount: Optional[bool] = None
+    amount_parameter: Optional[str] = None
+    targets: List[RedirectTargetResponse] = []
     class Config:
         from_attributes = True
 
 
+class DynamicPaymentURLFilter(BaseModel):
+    """Фильтры истории ссылок; период задаёт пересечение с [valid_from, valid_until)"""
+    name: Optional[str] = Field(None, min_length=1, max_length=200)
+    is_active: Optional[bool] = None
+    overlaps_from: Optional[datetime] = None
+    overlaps_until: Optional[datetime] = None
+
+
 class APIResponse(BaseModel):
     success: bool
     message: Optional[str] = None
@@ -1,4 +1,8 @@
-from pydantic import BaseModel, Field
+from collections import Counter
+from datetime import date
+from typing import List, Optional
+
+from pydantic import BaseModel, Field, field_validator
 
 
 class WorkingHoursUpdate(BaseModel):
@@ -6,6 +10,26 @@ class WorkingHoursUpdate(BaseModel):
     work_start: str = Field(..., pattern=r"^\d{2}:\d{2}$")
     work_end: str = Field(..., pattern=r"^\d{2}:\d{2}$")
     is_enabled: bool = True
+    timezone: str = "Europe/Moscow"
+
+
+MAX_INTERVALS_PER_DAY = 8
+
+
+class WorkingHoursBulkUpdate(BaseModel):
+    """Интервалы по дням: каждый переданный день заменяется целиком, остальные не меняются"""
+
+    days: List[WorkingHoursUpdate] = Field(..., min_length=1, max_length=7 * MAX_INTERVALS_PER_DAY)
+
+    @field_validator("days")
+    @classmethod
+    def unique_intervals(cls, days: List[WorkingHoursUpdate]) -> List[WorkingHoursUpdate]:
+        if len({(day.day_of_week, day.work_start) for day in days}) != len(days):
+            raise ValueError("intervals of one day must start at different times")
+        per_day = Counter(day.day_of_week for day in days)
+        if max(per_day.values()) > MAX_INTERVALS_PER_DAY:
+            raise ValueError(f"at most {MAX_INTERVALS_PER_DAY} intervals per day")
+        return days
 
 
 class WorkingHoursResponse(BaseModel):
@@ -14,6 +38,29 @@ class WorkingHoursResponse(BaseModel):
     work_start: str
     work_end: str
     is_enabled: bool
+    timezone: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class ScheduleOverrideCreate(BaseModel):
+    day: date
+    work_start: Optional[str] = Field(None, pattern=r"^\d{2}:\d{2}$")
+    work_end: Optional[str] = Field(None, pattern=r"^\d{2}:\d{2}$")
+    is_enabled: bool = False
+    timezone: str = "Europe/Moscow"
+    name: Optional[str] = None
+
+
+class ScheduleOverrideResponse(BaseModel):
+    id: int
+    day: date
+    work_start: Optional[str]
+    work_end: Optional[str]
+    is_enabled: bool
+    timezone: Optional[str]
+    name: Optional[str]
 
     class Config:
         from_attributes = True
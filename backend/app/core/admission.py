@@ -0,0 +1,182 @@
+import asyncio
+import time
+from collections import deque
+from typing import Optional
+
+import orjson
+
+from . import metrics, responses
+from .config import settings
+
+# Живут минутами и в БД не ходят: слот лимита они бы держали впустую
+EXEMPT_PATHS = frozenset({"/health", "/metrics", "/api/payment-events"})
+
+_OVERLOADED_BODY = orjson.dumps({"detail": "Сервис перегружен, повторите запрос позже"})
+
+
+class AdaptiveLimiter:
+    """Лимит одновременных запросов воркера по схеме AIMD.
+
+    Ответ быстрее ADMISSION_TARGET_LATENCY_MS поднимает лимит на 1/limit
+    (примерно +1 за каждый «круг» запросов), но только пока лимит реально
+    используется. Медленный ответ умножает лимит на ADMISSION_BACKOFF — не чаще
+    одного раза за время самого ответа, чтобы пачка медленных запросов,
+    начатых до снижения, не обрушила лимит до минимума. Сверх лимита запрос
+    ждёт в FIFO-очереди не дольше своего дедлайна.
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        min_limit: int,
+        max_limit: int,
+        target_latency: float,
+        backoff: float,
+        max_queue: int,
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(min(max(initial, min_limit), max_limit))
+        self.target_latency = target_latency
+        self.backoff = backoff
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        self._last_decrease = 0.0
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self, timeout: float) -> bool:
+        """Занять слот; False — не дождались за timeout секунд"""
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return True
+        if timeout <= 0 or len(self._waiters) >= self.max_queue:
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        except asyncio.CancelledError:
+            # Клиент ушёл ровно тогда, когда ему передали слот: отдать слот дальше
+            if waiter.done() and not waiter.cancelled():
+                self.release(None)
+            raise
+        finally:
+            if waiter.cancelled():
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+
+    def release(self, latency: Optional[float]) -> None:
+        """Освободить слот; latency None — запрос не выполнялся и лимит не меняет"""
+        if latency is not None:
+            self._adjust(latency)
+        self.in_flight -= 1
+        # Слот переходит ждущему напрямую, не уменьшая in_flight
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(True)
+
+    def _adjust(self, latency: float) -> None:
+        if latency > self.target_latency:
+            now = time.monotonic()
+            if now - self._last_decrease >= latency:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self._last_decrease = now
+        elif self.in_flight * 2 >= self.limit:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+
+limiter = AdaptiveLimiter(
+    initial=settings.ADMISSION_INITIAL_LIMIT,
+    min_limit=settings.ADMISSION_MIN_LIMIT,
+    max_limit=settings.ADMISSION_MAX_LIMIT,
+    target_latency=settings.ADMISSION_TARGET_LATENCY_MS / 1000,
+    backoff=settings.ADMISSION_BACKOFF,
+    max_queue=settings.ADMISSION_MAX_QUEUE,
+)
+
+
+def state() -> dict:
+    return {
+        "limit": round(limiter.limit, 1),
+        "in_flight": limiter.in_flight,
+        "queued": limiter.queued,
+    }
+
+
+class AdmissionMiddleware:
+    """ASGI-middleware перед роутерами: адаптивный лимит и сброс нагрузки.
+
+    Платёжные ручки ждут слот до ADMISSION_PAYMENT_QUEUE_TIMEOUT, а сброшенные
+    получают последний удачный ответ этой ручки (responses.last_good) с
+    заголовком X-Degraded. Остальные, в первую очередь админка, ждут
+    ADMISSION_QUEUE_TIMEOUT и быстро получают 503 с Retry-After.
+    """
+
+    def __init__(self, app, admission: AdaptiveLimiter = limiter):
+        self.app = app
+        self.limiter = admission
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS" or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        payment = responses.has_fallback(scope["path"])
+        timeout = (
+            settings.ADMISSION_PAYMENT_QUEUE_TIMEOUT if payment else settings.ADMISSION_QUEUE_TIMEOUT
+        )
+        if not await self.limiter.acquire(timeout):
+            await self._shed(scope, send, payment)
+            return
+
+        started = time.perf_counter()
+        latency: Optional[float] = None
+
+        async def send_wrapper(message):
+            nonlocal latency
+            if message["type"] == "http.response.start":
+                # Время до заголовков: для потоковых ответов тело не в счёт
+                latency = time.perf_counter() - started
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if latency is None:
+                latency = time.perf_counter() - started
+            self.limiter.release(latency)
+            metrics.ADMISSION_LIMIT.set(self.limiter.limit)
+
+    @staticmethod
+    async def _shed(scope, send, payment: bool) -> None:
+        body = responses.last_good(scope["path"]) if payment else None
+        if body is not None:
+            metrics.ADMISSION_SHED.labels("degraded").inc()
+            status, headers = 200, [
+                (b"content-type", b"application/json"),
+                (b"cache-control", b"no-store"),
+                (b"x-degraded", b"shed"),
+            ]
+        else:
+            metrics.ADMISSION_SHED.labels("rejected").inc()
+            body = _OVERLOADED_BODY
+            status, headers = 503, [
+                (b"content-type", b"application/json"),
+                (b"cache-control", b"no-store"),
+                (b"retry-after", b"1"),
+            ]
+        headers.append((b"content-length", str(len(body)).encode()))
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
@@ -1,16 +1,46 @@
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+from typing import Optional
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from . import timing
 from .config import settings
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt отпускает GIL, но занимает ядро на ~200 мс: отдельный маленький пул
+# и ограниченная очередь, чтобы всплеск логинов не отнимал потоки у платежей
+_bcrypt_pool = ThreadPoolExecutor(max_workers=settings.BCRYPT_THREADS, thread_name_prefix="bcrypt")
+_bcrypt_slots = asyncio.Semaphore(settings.BCRYPT_MAX_PENDING)
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    if _bcrypt_slots.locked():
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts",
+            headers={"Retry-After": "1"},
+        )
+    async with _bcrypt_slots:
+        loop = asyncio.get_running_loop()
+        with timing.phase("bcrypt"):
+            return await loop.run_in_executor(
+                _bcrypt_pool, verify_password, plain_password, hashed_password
+            )
+
+
 def create_access_token(data: dict) -> str:
     payload = data.copy()
     expire = datetime.now(timezone.utc) + timedelta(minutes=settings.JWT_EXPIRATION_MINUTES)
@@ -19,7 +49,49 @@ def create_access_token(data: dict) -> str:
     return token
 
 
+class TokenCache:
+    """LRU проверенных токенов: ключ - sha256 токена, запись живёт до exp"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[bytes, tuple[dict, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[dict]:
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            payload, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return payload
+
+    def put(self, token: str, payload: dict) -> None:
+        expires_at = payload.get("exp")
+        if not isinstance(expires_at, (int, float)):
+            return
+        with self._lock:
+            self._entries[self._key(token)] = (payload, float(expires_at))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+token_cache = TokenCache(settings.AUTH_TOKEN_CACHE_SIZE)
+
+
 def verify_token(token: str) -> dict:
+    payload = token_cache.get(token)
+    if payload is not None:
+        return payload
+
     try:
         payload = jwt.decode(
             token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM]
@@ -31,6 +103,7 @@ def verify_token(token: str) -> dict:
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid authentication token",
             )
+        token_cache.put(token, payload)
         return payload
     except JWTError:
         raise HTTPException(
@@ -47,5 +120,6 @@ async def get_current_admin(
 ) -> dict:
 
     token = credentials.credentials
-    payload = verify_token(token)
+    with timing.phase("auth"):
+        payload = verify_token(token)
     return payload
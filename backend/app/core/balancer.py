@@ -0,0 +1,37 @@
+import threading
+from collections import Counter
+from typing import Sequence, TypeVar
+
+T = TypeVar("T")
+
+# Попадания по (redirect_id, target_id) в этом воркере с момента старта
+hits: Counter = Counter()
+
+
+class SmoothWeightedBalancer:
+    """Smooth weighted round-robin (как в nginx upstream).
+
+    На каждый выбор текущие веса растут на заданные, победитель теряет
+    сумму весов. На любом окне из sum(weights) выборов доли точные, а
+    цели перемешаны равномерно - поэтому и сумма независимых воркеров
+    сходится к заданному соотношению без общего состояния.
+    """
+
+    def __init__(self, items: Sequence[T], weights: Sequence[int]):
+        if not items or len(items) != len(weights) or min(weights) <= 0:
+            raise ValueError("items and positive weights are required")
+        self.items = tuple(items)
+        self.weights = tuple(weights)
+        self.total = sum(weights)
+        self._current = [0] * len(items)
+        self._lock = threading.Lock()
+
+    def choose(self) -> T:
+        with self._lock:
+            best = 0
+            for index, weight in enumerate(self.weights):
+                self._current[index] += weight
+                if self._current[index] > self._current[best]:
+                    best = index
+            self._current[best] -= self.total
+        return self.items[best]
@@ -0,0 +1,133 @@
+import asyncio
+import hashlib
+import json
+from datetime import datetime, timezone
+from typing import AsyncIterator, Optional
+
+from . import routing
+
+MAX_SLEEP = 3600.0
+
+# Комментарий-пинг не даёт прокси закрыть простаивающее соединение
+HEARTBEAT_INTERVAL = 25.0
+RETRY_MS = 3000
+
+
+def link_digest(redirect: "routing.ActiveRedirect") -> str:
+    """Меняется вместе с реквизитами: id, основной ссылкой или набором целей"""
+    source = repr((redirect.id, redirect.target_url, redirect.targets))
+    return hashlib.sha256(source.encode()).hexdigest()[:16]
+
+
+def compute_state(snapshot: "routing.RoutingSnapshot", now: datetime) -> dict:
+    is_working, message = snapshot.schedule.status(now)
+    redirect = snapshot.active_redirect(now)
+
+    next_change = snapshot.next_change(now)
+
+    if not is_working:
+        error = "closed"
+    elif redirect is None:
+        error, message = "maintenance", "Платежная система временно недоступна"
+    else:
+        error = None
+
+    return {
+        "open": error is None,
+        "error": error,
+        "message": message,
+        "redirect_id": redirect.id if redirect else None,
+        "link": link_digest(redirect) if redirect else None,
+        "next_change": next_change.isoformat() if next_change else None,
+    }
+
+
+class Broadcaster:
+    """Рассылка состояния платёжной страницы всем SSE-подписчикам воркера.
+
+    Состояние пересчитывается одной задачей - при перезагрузке снапшота и
+    на ближайшей смене расписания или ссылки. Подписчики ждут одно общее
+    событие, так что простаивающая вкладка стоит одну корутину.
+    """
+
+    def __init__(self):
+        self.state: Optional[dict] = None
+        self.event_id = 0
+        self.subscribers = 0
+        self._published = asyncio.Event()
+        self._changed = asyncio.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def notify(self, snapshot=None) -> None:
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._changed.set)
+
+    def _publish(self, state: dict) -> None:
+        if state == self.state:
+            return
+        self.state = state
+        self.event_id += 1
+        published, self._published = self._published, asyncio.Event()
+        published.set()
+
+    async def _run(self) -> None:
+        while True:
+            self._changed.clear()
+            timeout = MAX_SLEEP
+
+            try:
+                snapshot = routing.get_snapshot()
+            except RuntimeError:
+                snapshot = None
+
+            if snapshot is not None:
+                now = datetime.now(timezone.utc)
+                state = compute_state(snapshot, now)
+                self._publish(state)
+                if state["next_change"]:
+                    change = datetime.fromisoformat(state["next_change"])
+                    timeout = min(max((change - now).total_seconds(), 0), MAX_SLEEP)
+
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _format(self) -> str:
+        data = json.dumps(self.state, ensure_ascii=False)
+        return f"id: {self.event_id}\nevent: state\ndata: {data}\n\n"
+
+    async def stream(self) -> AsyncIterator[str]:
+        self.subscribers += 1
+        try:
+            yield f"retry: {RETRY_MS}\n\n"
+            sent = 0
+            while True:
+                published = self._published
+                if self.state is not None and sent != self.event_id:
+                    sent = self.event_id
+                    yield self._format()
+                    continue
+
+                try:
+                    await asyncio.wait_for(published.wait(), HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+        finally:
+            self.subscribers -= 1
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+broadcaster = Broadcaster()
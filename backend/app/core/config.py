@@ -1,11 +1,18 @@
+from typing import Optional
 from zoneinfo import ZoneInfo
 
+from pydantic import field_validator
 from pydantic_settings import BaseSettings
 from functools import lru_cache
 
 
 MOSCOW_TZ = ZoneInfo("Europe/Moscow")
 
+ROUTING_CHANNEL = "routing_changed"
+
+# Ключ pg_advisory_xact_lock, сериализующий смену активной ссылки
+ACTIVATION_LOCK_KEY = 7_341_209_001
+
 
 class Settings(BaseSettings):
     DEBUG: bool
@@ -30,9 +37,97 @@ class Settings(BaseSettings):
     DB_USER: str
     DB_PASSWORD: str
 
+    # Реплика для чтения админских списков; без неё чтение идёт в основную БД
+    DB_REPLICA_HOST: Optional[str] = None
+    DB_REPLICA_PORT: Optional[int] = None
+    # Сколько секунд после правки админ читает из основной БД, пока реплика догоняет
+    READ_YOUR_WRITES_WINDOW: int = 5
+
+    # Бюджеты соединений на весь сервис; делятся поровну между воркерами uvicorn
+    WORKERS: int = 4
+    DB_CONNECTION_BUDGET: int = 80
+    DB_READ_CONNECTION_BUDGET: int = 40
+
+    SESSION_BUFFER_MAX_SIZE: int = 10000
+    SESSION_FLUSH_BATCH_SIZE: int = 500
+    SESSION_FLUSH_INTERVAL: float = 1.0
+
+    # Потолок max-age для кешируемого статуса оплаты: правки админа видны не позже
+    PAYMENT_STATUS_MAX_AGE: int = 30
+
+    # Последний согласованный снапшот маршрутизации на случай недоступности БД
+    SNAPSHOT_FILE: str = "/tmp/payment-gateway/routing-snapshot.json"
+    SNAPSHOT_MAX_STALENESS: int = 3600
+
+    SERVER_TIMING_ENABLED: bool = False
+    SLOW_REQUEST_THRESHOLD_MS: float = 500
+    # Доля запросов под pyinstrument; профили пишутся в PROFILE_DIR для speedscope
+    PROFILE_SAMPLE_RATE: float = 0.0
+    PROFILE_DIR: str = "/tmp/profiles"
+
+    # Token bucket на IP клиента, общий для воркеров: запросов в секунду и запас на всплеск;
+    # rate 0 отключает группу. Пустой RATE_LIMIT_FILE — файл в /dev/shm
+    RATE_LIMIT_PAYMENT_RATE: float = 5.0
+    RATE_LIMIT_PAYMENT_BURST: int = 20
+    RATE_LIMIT_LOGIN_RATE: float = 0.2
+    RATE_LIMIT_LOGIN_BURST: int = 5
+    RATE_LIMIT_FILE: str = ""
+    RATE_LIMIT_SLOTS: int = 65536
+
+    # Адаптивный лимит одновременных запросов на воркер (AIMD по задержке ответа)
+    ADMISSION_INITIAL_LIMIT: int = 32
+    ADMISSION_MIN_LIMIT: int = 4
+    ADMISSION_MAX_LIMIT: int = 256
+    ADMISSION_TARGET_LATENCY_MS: float = 250
+    ADMISSION_BACKOFF: float = 0.8
+    ADMISSION_MAX_QUEUE: int = 256
+    # Сколько секунд запрос ждёт слот: платёжный потом получает последний ответ, остальные 503
+    ADMISSION_PAYMENT_QUEUE_TIMEOUT: float = 0.2
+    ADMISSION_QUEUE_TIMEOUT: float = 0.05
+
+    # Подписанные session_id: "id:секрет" через запятую, первый подписывает, остальные
+    # принимаются до истечения выданных ими токенов; пусто — ключ из JWT_SECRET_KEY
+    SESSION_TOKEN_KEYS: str = ""
+    # Срок жизни сессии платёжной страницы, совпадает с таймером фронтенда
+    SESSION_TOKEN_TTL: int = 300
+
+    AUTH_TOKEN_CACHE_SIZE: int = 1024
+    BCRYPT_THREADS: int = 2
+    BCRYPT_MAX_PENDING: int = 8
+
+    @field_validator("SESSION_TOKEN_TTL")
+    @classmethod
+    def _check_session_token_ttl(cls, value: int) -> int:
+        # В токене срок хранится двумя байтами
+        if not 1 <= value <= 65535:
+            raise ValueError("SESSION_TOKEN_TTL должен быть от 1 до 65535 секунд")
+        return value
+
+    def _database_url(self, driver: str, host: str, port: int) -> str:
+        # Путь вместо хоста — подключение через Unix-сокет в этом каталоге
+        if host.startswith("/"):
+            return f"{driver}://{self.DB_USER}:{self.DB_PASSWORD}@/{self.DB_NAME}?host={host}&port={port}"
+        return f"{driver}://{self.DB_USER}:{self.DB_PASSWORD}@{host}:{port}/{self.DB_NAME}"
+
     @property
     def DATABASE_URL(self) -> str:
-        return f"postgresql://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
+        return self._database_url("postgresql", self.DB_HOST, self.DB_PORT)
+
+    @property
+    def ASYNC_DATABASE_URL(self) -> str:
+        return self._database_url("postgresql+asyncpg", self.DB_HOST, self.DB_PORT)
+
+    @property
+    def READ_DATABASE_URL(self) -> str:
+        if not self.DB_REPLICA_HOST:
+            return self.DATABASE_URL
+        return self._database_url(
+            "postgresql", self.DB_REPLICA_HOST, self.DB_REPLICA_PORT or self.DB_PORT
+        )
+
+    @property
+    def ASYNC_READ_DATABASE_URL(self) -> str:
+        return self.READ_DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,218 @@
+import asyncio
+import os
+import re
+import time
+from typing import Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+
+from . import timing
+
+# uvicorn --workers поднимает отдельные процессы: метрики складываются в файлы
+# каталога PROMETHEUS_MULTIPROC_DIR и суммируются при отдаче /metrics
+MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+LOOP_LAG_INTERVAL = 0.5
+
+REQUESTS = Counter(
+    "http_requests_total", "HTTP requests", ["method", "route", "status"]
+)
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ["method", "route"]
+)
+SQL_LATENCY = Histogram(
+    "db_statement_duration_seconds",
+    "SQL statement execution time",
+    ["engine", "statement"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out", "Connections checked out", ["engine"], multiprocess_mode="livesum"
+)
+POOL_WAIT = Histogram(
+    "db_pool_wait_seconds",
+    "Time to check a connection out of the pool",
+    ["engine"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+POOL_OVERFLOW = Gauge(
+    "db_pool_overflow", "Connections above pool_size", ["engine"], multiprocess_mode="livesum"
+)
+LOOP_LAG = Gauge(
+    "event_loop_lag_seconds", "Event loop scheduling delay", multiprocess_mode="livemax"
+)
+PAYMENT_OUTCOMES = Counter(
+    "payment_outcomes_total", "Payment endpoint outcomes", ["endpoint", "outcome"]
+)
+RATE_LIMITED = Counter(
+    "rate_limited_total", "Requests rejected by the per-client rate limit", ["group"]
+)
+ADMISSION_LIMIT = Gauge(
+    "admission_concurrency_limit", "Adaptive in-flight request limit", multiprocess_mode="livesum"
+)
+ADMISSION_SHED = Counter(
+    "admission_shed_total", "Requests shed by the admission controller", ["outcome"]
+)
+
+_STATEMENT = re.compile(r"^\s*(\w+)(?:.*?\b(?:FROM|INTO|UPDATE)\s+\"?(\w+))?", re.I | re.S)
+
+
+def statement_label(statement: str) -> str:
+    """Метка без параметров и длины VALUES: операция и основная таблица"""
+    match = _STATEMENT.match(statement)
+    if not match:
+        return "other"
+    operation, table = match.groups()
+    return f"{operation.upper()} {table}" if table else operation.upper()
+
+
+def instrument_engine(engine, name: str) -> None:
+    """Тайминг SQL и состояние пула; для async-движка передаётся его sync_engine"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._metrics_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_metrics_started", None)
+        if started is not None:
+            elapsed = time.perf_counter() - started
+            SQL_LATENCY.labels(name, statement_label(statement)).observe(elapsed)
+            timing.add("db", elapsed)
+
+    def _pool_state(returning: int = 0):
+        POOL_CHECKED_OUT.labels(name).set(max(engine.pool.checkedout() - returning, 0))
+        POOL_OVERFLOW.labels(name).set(max(engine.pool.overflow(), 0))
+
+    # checkin вызывается до возврата соединения в очередь пула
+    event.listen(engine.pool, "checkout", lambda *args: _pool_state())
+    event.listen(engine.pool, "checkin", lambda *args: _pool_state(returning=1))
+
+
+def timed_pool(pool_class, name: str):
+    """Класс пула, замеряющий выдачу соединения: у SQLAlchemy нет события до checkout.
+
+    Время идёт в гистограмму и в фазу pool заголовка Server-Timing; включает
+    ожидание свободного соединения, открытие нового и pre-ping.
+    """
+
+    class TimedPool(pool_class):
+        def connect(self):
+            started = time.perf_counter()
+            try:
+                return super().connect()
+            finally:
+                elapsed = time.perf_counter() - started
+                POOL_WAIT.labels(name).observe(elapsed)
+                timing.add("pool", elapsed)
+
+    TimedPool.__name__ = TimedPool.__qualname__ = f"Timed{pool_class.__name__}"
+    return TimedPool
+
+
+def record_outcome(endpoint: str, outcome: str) -> None:
+    PAYMENT_OUTCOMES.labels(endpoint, outcome).inc()
+
+
+class MetricsMiddleware:
+    """ASGI-middleware: счётчик и гистограмма по шаблону маршрута.
+
+    Потоковые ответы (SSE) живут минутами, их длительность в гистограмму
+    не попадает - только счётчик.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._routes: dict = {}
+
+    def _route(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        route = self._routes.get(endpoint)
+        if route is None:
+            route = "unmatched"
+            for candidate in scope["app"].routes:
+                if getattr(candidate, "endpoint", None) is endpoint:
+                    route = candidate.path
+                    break
+            self._routes[endpoint] = route
+        return route
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+        streaming = False
+
+        async def send_wrapper(message):
+            nonlocal status, streaming
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                for key, value in message.get("headers", ()):
+                    if key == b"content-type" and value.startswith(b"text/event-stream"):
+                        streaming = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = self._route(scope)
+            REQUESTS.labels(scope["method"], route, str(status)).inc()
+            if not streaming:
+                REQUEST_LATENCY.labels(scope["method"], route).observe(
+                    time.perf_counter() - started
+                )
+
+
+async def monitor_loop_lag() -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + LOOP_LAG_INTERVAL
+        await asyncio.sleep(LOOP_LAG_INTERVAL)
+        LOOP_LAG.set(max(loop.time() - expected, 0))
+
+
+class LoopLagMonitor:
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(monitor_loop_lag())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if MULTIPROC_DIR:
+            multiprocess.mark_process_dead(os.getpid())
+
+
+loop_lag = LoopLagMonitor()
+
+
+def render() -> tuple[bytes, str]:
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
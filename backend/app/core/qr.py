@@ -0,0 +1,99 @@
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+import qrcode
+from PIL import Image
+
+FORMATS = ("png", "svg")
+SIZES = (200, 300, 512)
+DEFAULT_SIZE = 300
+CACHE_SIZE = 64
+
+MEDIA_TYPES = {"png": "image/png", "svg": "image/svg+xml"}
+
+
+@dataclass(frozen=True)
+class QRImage:
+    content: bytes
+    media_type: str
+    etag: str
+
+
+def url_digest(url: str) -> str:
+    return hashlib.sha256(url.encode()).hexdigest()[:32]
+
+
+def _matrix(url: str) -> list[list[bool]]:
+    code = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_H, border=4)
+    code.add_data(url)
+    code.make(fit=True)
+    return code.get_matrix()
+
+
+def _render_png(matrix: list[list[bool]], size: int) -> bytes:
+    modules = len(matrix)
+    image = Image.new("1", (modules, modules), 1)
+    image.putdata([0 if cell else 1 for row in matrix for cell in row])
+    image = image.resize((size, size), Image.NEAREST)
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def _render_svg(matrix: list[list[bool]], size: int) -> bytes:
+    modules = len(matrix)
+    path = "".join(
+        f"M{x},{y}h1v1h-1z"
+        for y, row in enumerate(matrix)
+        for x, cell in enumerate(row)
+        if cell
+    )
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" '
+        f'viewBox="0 0 {modules} {modules}" shape-rendering="crispEdges">'
+        f'<rect width="{modules}" height="{modules}" fill="#fff"/>'
+        f'<path d="{path}" fill="#000"/></svg>'
+    ).encode()
+
+
+class QRCache:
+    """LRU готовых изображений, ключ - хеш ссылки, формат и размер"""
+
+    def __init__(self, max_entries: int = CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple[str, str, int], QRImage] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, url: str, fmt: str, size: int) -> Optional[QRImage]:
+        key = (url_digest(url), fmt, size)
+        with self._lock:
+            image = self._entries.get(key)
+            if image is not None:
+                self._entries.move_to_end(key)
+            return image
+
+    def _put(self, key: tuple[str, str, int], image: QRImage) -> None:
+        with self._lock:
+            self._entries[key] = image
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def render(self, url: str, fmt: str, size: int) -> QRImage:
+        digest = url_digest(url)
+        matrix = _matrix(url)
+        content = _render_png(matrix, size) if fmt == "png" else _render_svg(matrix, size)
+        image = QRImage(
+            content=content,
+            media_type=MEDIA_TYPES[fmt],
+            etag=f'"{digest}-{size}.{fmt}"',
+        )
+        self._put((digest, fmt, size), image)
+        return image
+
+
+cache = QRCache()
@@ -0,0 +1,180 @@
+import fcntl
+import hashlib
+import math
+import mmap
+import os
+import struct
+import tempfile
+import time
+from typing import Optional
+
+import orjson
+
+from . import metrics
+from .config import settings
+
+# Слот: хеш (группа, клиент) и момент, когда ведро снова будет полным.
+# Одного числа достаточно: токенов сейчас = burst - (full_at - now) * rate,
+# а слот с full_at в прошлом ничем не отличается от пустого и переиспользуется
+_SLOT = struct.Struct("<Qd")
+_HEADER = struct.Struct("<8sQ")
+_MAGIC = b"rlbucket"
+_PROBES = 8
+
+_REJECTED_BODY = orjson.dumps({"detail": "Too many requests"})
+
+
+class Limit:
+    def __init__(self, group: str, rate: float, burst: int):
+        self.group = group
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.interval = 1 / rate if rate > 0 else 0.0
+        # Насколько full_at может уйти вперёд, чтобы ещё остался целый токен
+        self.tolerance = (self.burst - 1) * self.interval
+
+
+PAYMENT = Limit("payment", settings.RATE_LIMIT_PAYMENT_RATE, settings.RATE_LIMIT_PAYMENT_BURST)
+LOGIN = Limit("login", settings.RATE_LIMIT_LOGIN_RATE, settings.RATE_LIMIT_LOGIN_BURST)
+
+ROUTES = {
+    "/api/payment-link": PAYMENT,
+    "/api/generate-qr": PAYMENT,
+    "/api/session": PAYMENT,
+    "/pay": PAYMENT,
+    "/api/auth/login": LOGIN,
+}
+
+
+def default_path() -> str:
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(directory, "payment-gateway-ratelimit")
+
+
+class BucketTable:
+    """Таблица token bucket в mmap-файле, общая для всех воркеров uvicorn.
+
+    Открытая адресация с _PROBES пробами; проверка — flock и пара struct-операций
+    над общей памятью, без БД и межпроцессных сообщений. Файл открывается лениво,
+    уже в процессе воркера.
+    """
+
+    def __init__(self, path: str, slots: int):
+        self.path = path
+        self.slots = max(slots, _PROBES)
+        self._size = _HEADER.size + self.slots * _SLOT.size
+        self._fd: Optional[int] = None
+        self._map: Optional[mmap.mmap] = None
+        self._pid: Optional[int] = None
+
+    def _open(self) -> mmap.mmap:
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            # Файл от прошлого запуска с другим размером таблицы начинаем с нуля
+            if os.fstat(fd).st_size != self._size or os.pread(fd, _HEADER.size, 0) != _HEADER.pack(_MAGIC, self.slots):
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, self._size)
+                os.pwrite(fd, _HEADER.pack(_MAGIC, self.slots), 0)
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        self._fd, self._pid = fd, os.getpid()
+        self._map = mmap.mmap(fd, self._size)
+        return self._map
+
+    @staticmethod
+    def key(group: str, client: str) -> int:
+        # hash() солится в каждом процессе, нужен одинаковый для всех воркеров
+        digest = hashlib.blake2b(f"{group}\0{client}".encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "little") or 1
+
+    def acquire(self, limit: Limit, client: str, now: Optional[float] = None) -> float:
+        """Взять токен; 0 — запрос пропущен, иначе сколько секунд ждать"""
+        if limit.rate <= 0:
+            return 0.0
+        mapped = self._map if self._pid == os.getpid() else self._open()
+        now = time.time() if now is None else now
+        key = self.key(limit.group, client)
+        first = key % (self.slots - _PROBES + 1)
+
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            chosen, full_at = None, now
+            evict, evict_full_at = None, math.inf
+            for index in range(first, first + _PROBES):
+                offset = _HEADER.size + index * _SLOT.size
+                slot_key, slot_full_at = _SLOT.unpack_from(mapped, offset)
+                if slot_key == key:
+                    chosen, full_at = offset, max(slot_full_at, now)
+                    break
+                if slot_full_at <= now:
+                    if evict_full_at > 0:
+                        evict, evict_full_at = offset, 0
+                elif slot_full_at < evict_full_at:
+                    # Все пробы заняты живыми вёдрами: вытесняем самое близкое к полному
+                    evict, evict_full_at = offset, slot_full_at
+            if chosen is None:
+                chosen = evict
+
+            wait = full_at - now - limit.tolerance
+            if wait > 0:
+                return wait
+            _SLOT.pack_into(mapped, chosen, key, full_at + limit.interval)
+            return 0.0
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+
+buckets = BucketTable(settings.RATE_LIMIT_FILE or default_path(), settings.RATE_LIMIT_SLOTS)
+
+
+def client_address(scope) -> str:
+    """IP клиента за nginx: X-Real-IP, иначе последний адрес X-Forwarded-For.
+
+    Левые элементы X-Forwarded-For присылает сам клиент, доверять можно только
+    адресу, который дописал nginx.
+    """
+    forwarded = None
+    for name, value in scope["headers"]:
+        if name == b"x-real-ip":
+            return value.decode("latin-1").strip()
+        if name == b"x-forwarded-for":
+            forwarded = value
+    if forwarded:
+        return forwarded.decode("latin-1").rsplit(",", 1)[-1].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+class RateLimitMiddleware:
+    """ASGI-middleware: 429 с Retry-After для публичных платёжных ручек и логина"""
+
+    def __init__(self, app, table: BucketTable = buckets):
+        self.app = app
+        self.table = table
+
+    async def __call__(self, scope, receive, send):
+        limit = ROUTES.get(scope["path"]) if scope["type"] == "http" else None
+        if limit is None or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        wait = self.table.acquire(limit, client_address(scope))
+        if not wait:
+            await self.app(scope, receive, send)
+            return
+
+        metrics.RATE_LIMITED.labels(limit.group).inc()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(_REJECTED_BODY)).encode()),
+                    (b"retry-after", str(math.ceil(wait)).encode()),
+                    (b"cache-control", b"no-store"),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": _REJECTED_BODY})
@@ -0,0 +1,102 @@
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional, Union
+
+import orjson
+
+from . import session_token
+from .config import settings
+
+_SESSION_MARKER = "__SESSION_ID__"
+_MARKER_BYTES = _SESSION_MARKER.encode()
+
+TEMPLATE_CACHE_SIZE = 256
+
+
+@dataclass(frozen=True)
+class SessionTemplate:
+    """Готовый JSON-ответ, в который подставляется только session_id"""
+
+    parts: tuple[bytes, ...]
+
+    def render(self, session_id: str) -> bytes:
+        # Подписанные session_id — base64url, экранировать нечего ни в JSON, ни в URL
+        return session_id.encode().join(self.parts)
+
+
+def _template(content: dict) -> SessionTemplate:
+    return SessionTemplate(parts=tuple(orjson.dumps(content).split(_MARKER_BYTES)))
+
+
+# Ссылка и QR ведут через /pay: срок сессии и реквизиты проверяются при переходе
+PAY_URL = f"{settings.PROTOCOL}://{settings.DOMAIN}/pay"
+
+
+def pay_url(session_id: str) -> str:
+    return f"{PAY_URL}?session={session_id}"
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def link_template(link: str) -> SessionTemplate:
+    return _template(
+        {
+            "success": True,
+            "session_id": _SESSION_MARKER,
+            "link": link,
+            "message": "Ссылка создана",
+        }
+    )
+
+
+QR_TEMPLATE = _template(
+    {
+        "success": True,
+        "qr_code": {
+            "url": pay_url(_SESSION_MARKER),
+            "session_id": _SESSION_MARKER,
+            "image": f"/api/qr-code.svg?session={_SESSION_MARKER}",
+        },
+        "message": "QR код сгенерирован",
+    }
+)
+
+SESSION_TEMPLATE = _template({"success": True, "session_id": _SESSION_MARKER})
+
+# Последний ответ платёжной ручки по пути и id ссылки, для которой он собран:
+# его получает запрос, сброшенный при перегрузке
+_last_good: dict[str, Optional[tuple[Union[SessionTemplate, bytes], Optional[int]]]] = {
+    "/api/payment-status": None,
+    "/api/payment-link": None,
+    "/api/generate-qr": None,
+    "/api/session": None,
+}
+
+
+def remember(path: str, answer: Union[SessionTemplate, bytes], redirect_id: Optional[int] = None) -> None:
+    _last_good[path] = (answer, redirect_id)
+
+
+def has_fallback(path: str) -> bool:
+    return path in _last_good
+
+
+def last_good(path: str) -> Optional[bytes]:
+    """Тело последнего ответа; шаблон получает новый session_id, в буфер сессий он не пишется"""
+    last = _last_good.get(path)
+    if last is None:
+        return None
+    answer, redirect_id = last
+    if isinstance(answer, SessionTemplate):
+        return answer.render(session_token.issue(redirect_id))
+    return answer
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def error_body(error: str, message: str) -> bytes:
+    return orjson.dumps({"success": False, "error": error, "message": message})
+
+
+def clear(snapshot=None) -> None:
+    """Сбросить шаблоны при смене снапшота, чтобы не копить старые ссылки"""
+    link_template.cache_clear()
+    error_body.cache_clear()
@@ -0,0 +1,427 @@
+import bisect
+import logging
+import select
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import Callable, Optional
+from urllib.parse import urlencode
+
+import psycopg2
+
+from . import snapshot_store
+from .balancer import SmoothWeightedBalancer, hits
+from .config import settings, MOSCOW_TZ, ROUTING_CHANNEL
+from .schedule import CompiledSchedule, compile_schedule
+from ..db import crud
+from ..db.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+RECONNECT_DELAY = 1.0
+MAX_RECONNECT_DELAY = 30.0
+# Как часто mtime файла снапшота продлевается, пока БД на связи
+SNAPSHOT_TOUCH_INTERVAL = 30.0
+
+
+@dataclass(frozen=True)
+class Target:
+    id: Optional[int]
+    target_url: str
+    weight: int = 1
+
+
+@dataclass(frozen=True)
+class ActiveRedirect:
+    id: int
+    name: Optional[str]
+    target_url: str
+    valid_from: datetime
+    valid_until: datetime
+    supports_amount: bool
+    amount_parameter: str
+    targets: tuple[Target, ...] = ()
+    balancer: Optional[SmoothWeightedBalancer] = field(default=None, compare=False, repr=False)
+
+    def choose(self) -> Target:
+        target = self.balancer.choose() if self.balancer else Target(None, self.target_url)
+        hits[(self.id, target.id)] += 1
+        return target
+
+    def url_for(self, amount: Optional[Decimal] = None, target: Optional[Target] = None) -> str:
+        target_url = target.target_url if target else self.target_url
+        if amount is None or not self.supports_amount:
+            return target_url
+        separator = "&" if "?" in target_url else "?"
+        value = format(amount.normalize(), "f")
+        return f"{target_url}{separator}{urlencode({self.amount_parameter: value})}"
+
+
+@dataclass(frozen=True)
+class WorkingDay:
+    day_of_week: int
+    work_start: str
+    work_end: str
+    is_enabled: bool
+    timezone: Optional[str]
+
+
+@dataclass(frozen=True)
+class OverrideDay:
+    day: date
+    work_start: Optional[str]
+    work_end: Optional[str]
+    is_enabled: bool
+    timezone: Optional[str]
+
+
+@dataclass(frozen=True)
+class RoutingSnapshot:
+    version: int
+    redirects: tuple[ActiveRedirect, ...]
+    queued: tuple[ActiveRedirect, ...]
+    boundaries: tuple[datetime, ...]
+    working_hours: tuple[WorkingDay, ...]
+    overrides: tuple[OverrideDay, ...]
+    schedule: CompiledSchedule
+    loaded_at: float
+
+    def active_redirect(self, now: Optional[datetime] = None) -> Optional[ActiveRedirect]:
+        """Действующая ссылка: из активных и запланированных побеждает начавшаяся позже"""
+        now = now or datetime.now(timezone.utc)
+        current = None
+        for redirect in self.redirects + self.queued:
+            if redirect.valid_from <= now <= redirect.valid_until:
+                if current is None or redirect.valid_from > current.valid_from:
+                    current = redirect
+        return current
+
+    def next_boundary(self, now: Optional[datetime] = None) -> Optional[datetime]:
+        now = now or datetime.now(timezone.utc)
+        index = bisect.bisect_right(self.boundaries, now)
+        return self.boundaries[index] if index < len(self.boundaries) else None
+
+    def next_change(self, now: Optional[datetime] = None) -> Optional[datetime]:
+        """Ближайшая смена ответа: открытие/закрытие или граница действия ссылки"""
+        now = now or datetime.now(timezone.utc)
+        changes = [
+            moment
+            for moment in (self.schedule.next_change(now), self.next_boundary(now))
+            if moment is not None
+        ]
+        return min(changes) if changes else None
+
+
+_snapshot: Optional[RoutingSnapshot] = None
+_source: Optional[str] = None
+_confirmed_at = 0.0
+_touched_at = 0.0
+_current: Optional[ActiveRedirect] = None
+_listener: Optional["SnapshotListener"] = None
+_reload_callbacks: list[Callable[[RoutingSnapshot], None]] = []
+
+
+def on_reload(callback: Callable[[RoutingSnapshot], None]) -> None:
+    """Подписаться на перезагрузку снапшота (вызывается в потоке слушателя)"""
+    _reload_callbacks.append(callback)
+
+
+def get_snapshot() -> RoutingSnapshot:
+    if _snapshot is None:
+        raise RuntimeError("Routing snapshot is not loaded")
+    if time.time() - _confirmed_at > settings.SNAPSHOT_MAX_STALENESS:
+        raise RuntimeError("Routing snapshot is stale")
+    return _snapshot
+
+
+def current_redirect() -> Optional[ActiveRedirect]:
+    """Готовый ответ для платёжных запросов, пересчитывается на границах расписания"""
+    get_snapshot()
+    return _current
+
+
+def refresh_current(now: Optional[datetime] = None) -> Optional[ActiveRedirect]:
+    global _current
+    _current = get_snapshot().active_redirect(now)
+    return _current
+
+
+def _to_redirect(url) -> ActiveRedirect:
+    targets = tuple(
+        Target(id=target.id, target_url=target.target_url, weight=target.weight)
+        for target in url.targets
+        if target.is_enabled
+    )
+    return ActiveRedirect(
+        id=url.id,
+        name=url.name,
+        target_url=url.target_url,
+        valid_from=_as_aware(url.valid_from),
+        valid_until=_as_aware(url.valid_until),
+        supports_amount=bool(url.supports_amount),
+        amount_parameter=url.amount_parameter or "sum",
+        targets=targets,
+        balancer=(
+            SmoothWeightedBalancer(targets, [target.weight for target in targets])
+            if targets
+            else None
+        ),
+    )
+
+
+def _as_aware(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def load_snapshot() -> RoutingSnapshot:
+    db = SessionLocal()
+    try:
+        version = crud.get_routing_version(db)
+        redirects = tuple(_to_redirect(url) for url in crud.get_active_dynamic_urls(db))
+        queued = tuple(_to_redirect(url) for url in crud.get_queued_dynamic_urls(db))
+        working_hours = tuple(
+            WorkingDay(
+                day_of_week=hours.day_of_week,
+                work_start=hours.work_start,
+                work_end=hours.work_end,
+                is_enabled=bool(hours.is_enabled),
+                timezone=hours.timezone,
+            )
+            for hours in crud.get_all_working_hours(db)
+        )
+        since = datetime.now(MOSCOW_TZ).date() - timedelta(days=1)
+        overrides = tuple(
+            OverrideDay(
+                day=override.day,
+                work_start=override.work_start,
+                work_end=override.work_end,
+                is_enabled=bool(override.is_enabled),
+                timezone=override.timezone,
+            )
+            for override in crud.get_schedule_overrides(db, since)
+        )
+    finally:
+        db.close()
+
+    return build_snapshot(version, redirects, queued, working_hours, overrides)
+
+
+def build_snapshot(
+    version: int,
+    redirects: tuple[ActiveRedirect, ...],
+    queued: tuple[ActiveRedirect, ...],
+    working_hours: tuple[WorkingDay, ...],
+    overrides: tuple[OverrideDay, ...],
+) -> RoutingSnapshot:
+    return RoutingSnapshot(
+        version=version,
+        redirects=redirects,
+        queued=queued,
+        boundaries=tuple(
+            sorted(
+                {redirect.valid_from for redirect in redirects + queued}
+                | {redirect.valid_until for redirect in redirects + queued}
+            )
+        ),
+        working_hours=working_hours,
+        overrides=overrides,
+        schedule=compile_schedule(working_hours, overrides, MOSCOW_TZ),
+        loaded_at=time.time(),
+    )
+
+
+def _redirect_document(redirect: ActiveRedirect) -> dict:
+    return {
+        "id": redirect.id,
+        "name": redirect.name,
+        "target_url": redirect.target_url,
+        "valid_from": redirect.valid_from,
+        "valid_until": redirect.valid_until,
+        "supports_amount": redirect.supports_amount,
+        "amount_parameter": redirect.amount_parameter,
+        "targets": [
+            {"id": target.id, "target_url": target.target_url, "weight": target.weight}
+            for target in redirect.targets
+        ],
+    }
+
+
+def _redirect_from_document(data: dict) -> ActiveRedirect:
+    return _to_redirect(
+        SimpleNamespace(
+            **{
+                **data,
+                "valid_from": datetime.fromisoformat(data["valid_from"]),
+                "valid_until": datetime.fromisoformat(data["valid_until"]),
+                "targets": [SimpleNamespace(**target, is_enabled=True) for target in data["targets"]],
+            }
+        )
+    )
+
+
+def snapshot_document(snapshot: RoutingSnapshot) -> dict:
+    return {
+        "version": snapshot.version,
+        "redirects": [_redirect_document(redirect) for redirect in snapshot.redirects],
+        "queued": [_redirect_document(redirect) for redirect in snapshot.queued],
+        "working_hours": list(snapshot.working_hours),
+        "overrides": list(snapshot.overrides),
+    }
+
+
+def snapshot_from_document(document: dict) -> RoutingSnapshot:
+    return build_snapshot(
+        version=document["version"],
+        redirects=tuple(_redirect_from_document(data) for data in document["redirects"]),
+        queued=tuple(_redirect_from_document(data) for data in document["queued"]),
+        working_hours=tuple(WorkingDay(**data) for data in document["working_hours"]),
+        overrides=tuple(
+            OverrideDay(**{**data, "day": date.fromisoformat(data["day"])})
+            for data in document["overrides"]
+        ),
+    )
+
+
+def freshness() -> dict:
+    """Откуда снапшот и сколько секунд назад он последний раз сверялся с БД"""
+    return {
+        "source": _source,
+        "version": _snapshot.version if _snapshot else None,
+        "age_seconds": round(time.time() - _confirmed_at, 1) if _snapshot else None,
+        "max_staleness": settings.SNAPSHOT_MAX_STALENESS,
+        "listener_connected": bool(_listener and _listener.connected),
+    }
+
+
+def _confirm() -> None:
+    """Снапшот совпадает с БД: слушатель на связи, пропущенных NOTIFY нет"""
+    global _confirmed_at, _touched_at
+    _confirmed_at = now = time.time()
+    if now - _touched_at >= SNAPSHOT_TOUCH_INTERVAL:
+        _touched_at = now
+        snapshot_store.touch(settings.SNAPSHOT_FILE)
+
+
+def _install(snapshot: RoutingSnapshot, source: str) -> None:
+    global _snapshot, _source
+    _snapshot, _source = snapshot, source
+    refresh_current()
+    logger.info("Routing snapshot loaded from %s, version %s", source, snapshot.version)
+
+    for callback in _reload_callbacks:
+        try:
+            callback(snapshot)
+        except Exception:
+            logger.exception("Routing reload callback %r failed", callback)
+
+
+def reload_snapshot() -> RoutingSnapshot:
+    global _touched_at
+    snapshot = load_snapshot()
+    _confirm()
+    _install(snapshot, "database")
+
+    try:
+        snapshot_store.save(settings.SNAPSHOT_FILE, snapshot_document(snapshot))
+        _touched_at = time.time()
+    except Exception:
+        logger.exception("Failed to persist routing snapshot to %s", settings.SNAPSHOT_FILE)
+
+    return snapshot
+
+
+def load_fallback() -> Optional[RoutingSnapshot]:
+    """Последний сохранённый снапшот, если он подтверждался не раньше окна устаревания"""
+    global _confirmed_at
+    try:
+        stored = snapshot_store.load(settings.SNAPSHOT_FILE)
+        if stored is None:
+            return None
+        document, confirmed_at = stored
+        if time.time() - confirmed_at > settings.SNAPSHOT_MAX_STALENESS:
+            logger.warning("Routing snapshot file %s is too stale", settings.SNAPSHOT_FILE)
+            return None
+        snapshot = snapshot_from_document(document)
+    except Exception:
+        logger.exception("Failed to read routing snapshot file %s", settings.SNAPSHOT_FILE)
+        return None
+
+    _confirmed_at = confirmed_at
+    _install(snapshot, "file")
+    return snapshot
+
+
+class SnapshotListener(threading.Thread):
+    """LISTEN на канале маршрутизации и перезагрузка снапшота по NOTIFY"""
+
+    def __init__(self, poll_interval: float = 1.0):
+        super().__init__(name="routing-snapshot-listener", daemon=True)
+        self.poll_interval = poll_interval
+        self.connected = False
+        self._stop_event = threading.Event()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def run(self) -> None:
+        delay = RECONNECT_DELAY
+        while not self._stop_event.is_set():
+            try:
+                self._listen()
+                delay = RECONNECT_DELAY
+            except Exception:
+                logger.exception("Routing listener failed, reconnecting in %.0fs", delay)
+                self._stop_event.wait(delay)
+                delay = min(delay * 2, MAX_RECONNECT_DELAY)
+
+    def _listen(self) -> None:
+        # keepalive, чтобы обрыв сети обнаруживался за секунды, а не по TCP-таймауту
+        conn = psycopg2.connect(
+            settings.DATABASE_URL,
+            connect_timeout=5,
+            keepalives=1,
+            keepalives_idle=5,
+            keepalives_interval=2,
+            keepalives_count=3,
+        )
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {ROUTING_CHANNEL}")
+
+            # Изменения, пропущенные пока соединения не было, подтягиваем сразу после LISTEN
+            reload_snapshot()
+            self.connected = True
+
+            while not self._stop_event.is_set():
+                ready, _, _ = select.select([conn], [], [], self.poll_interval)
+                if ready:
+                    conn.poll()
+                    if conn.notifies:
+                        conn.notifies.clear()
+                        reload_snapshot()
+                _confirm()
+        finally:
+            self.connected = False
+            conn.close()
+
+
+def start() -> None:
+    global _listener
+    try:
+        reload_snapshot()
+    except Exception:
+        logger.exception("Initial routing snapshot load failed, trying %s", settings.SNAPSHOT_FILE)
+        load_fallback()
+
+    _listener = SnapshotListener()
+    _listener.start()
+
+
+def stop() -> None:
+    if _listener is not None:
+        _listener.stop()
+        _listener.join(timeout=5)
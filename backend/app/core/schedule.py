@@ -0,0 +1,216 @@
+import bisect
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Iterable, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from . import timing
+from .utils import get_day_name
+
+MINUTES_PER_DAY = 24 * 60
+HORIZON_DAYS = 14
+
+CONFIG_ERROR_MESSAGE = "Ошибка в конфигурации рабочего времени"
+
+
+def parse_minutes(value: str) -> int:
+    hours, minutes = value.split(":")
+    hours, minutes = int(hours), int(minutes)
+    if not (0 <= hours < 24 and 0 <= minutes < 60):
+        raise ValueError(f"Invalid time: {value}")
+    return hours * 60 + minutes
+
+
+def format_minutes(value: int) -> str:
+    value %= MINUTES_PER_DAY
+    return f"{value // 60:02d}:{value % 60:02d}"
+
+
+@dataclass(frozen=True)
+class DayRule:
+    """Интервалы одного локального дня в минутах от полуночи.
+
+    Конец интервала может быть больше суток - так задаются ночные смены.
+    """
+
+    intervals: tuple[tuple[int, int], ...]
+    tz: ZoneInfo
+    error: bool = False
+
+    @property
+    def label(self) -> str:
+        return ", ".join(
+            f"{format_minutes(start)} - {format_minutes(end)}" for start, end in self.intervals
+        )
+
+
+CLOSED = DayRule(intervals=(), tz=timezone.utc)
+BROKEN = DayRule(intervals=(), tz=timezone.utc, error=True)
+
+
+def _zone(name: Optional[str], default_tz: ZoneInfo) -> ZoneInfo:
+    return ZoneInfo(name) if name else default_tz
+
+
+def build_rule(rows: Iterable, default_tz: ZoneInfo) -> DayRule:
+    """Собрать правило дня из строк с work_start/work_end/is_enabled/timezone.
+
+    Интервал полуоткрытый: в work_start уже открыто, в work_end уже закрыто.
+    Конец раньше начала - ночная смена, конец равный началу - пустой интервал,
+    как и раньше: такая строка день не открывает.
+    """
+    intervals = []
+    tz = default_tz
+    try:
+        for row in rows:
+            if not row.is_enabled:
+                continue
+            start = parse_minutes(row.work_start)
+            end = parse_minutes(row.work_end)
+            tz = _zone(row.timezone, default_tz)
+            if end == start:
+                continue
+            if end < start:
+                end += MINUTES_PER_DAY
+            intervals.append((start, end))
+    except (ValueError, AttributeError, TypeError, ZoneInfoNotFoundError):
+        return BROKEN
+
+    if not intervals:
+        return CLOSED
+    return DayRule(intervals=tuple(sorted(intervals)), tz=tz)
+
+
+class CompiledSchedule:
+    """Недельное расписание, развёрнутое в таблицу переходов по UTC.
+
+    Таблица строится один раз на горизонт в HORIZON_DAYS дней с учётом
+    часовых поясов и переходов на летнее время; запросы - бинарный поиск.
+    """
+
+    def __init__(
+        self,
+        weekly: dict[int, DayRule],
+        overrides: dict[date, DayRule],
+        default_tz: ZoneInfo,
+    ):
+        self.weekly = weekly
+        self.overrides = overrides
+        self.default_tz = default_tz
+        self._table = self._build(datetime.now(default_tz).date())
+
+    def rule_for(self, day: date) -> DayRule:
+        rule = self.overrides.get(day)
+        if rule is not None:
+            return rule
+        return self.weekly.get(day.weekday(), CLOSED)
+
+    def message_for(self, day: date) -> str:
+        rule = self.rule_for(day)
+        if rule.error:
+            return CONFIG_ERROR_MESSAGE
+        if not rule.intervals:
+            return f"Сегодня ({get_day_name(day.weekday())}) не рабочий день"
+        return f"Рабочее время: {rule.label}"
+
+    def _build(self, today: date):
+        first = today - timedelta(days=1)
+        horizon_start = datetime.combine(first, time(), tzinfo=self.default_tz).timestamp()
+        horizon_end = datetime.combine(
+            first + timedelta(days=HORIZON_DAYS + 1), time(), tzinfo=self.default_tz
+        ).timestamp()
+
+        # Открытые интервалы в UTC; берём на день раньше ради ночных смен
+        spans = []
+        for offset in range(-1, HORIZON_DAYS + 1):
+            day = first + timedelta(days=offset)
+            rule = self.rule_for(day)
+            for start, end in rule.intervals:
+                spans.append((self._at(day, start, rule.tz), self._at(day, end, rule.tz)))
+        spans.sort()
+
+        merged = []
+        for start, end in spans:
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+
+        # Полночь по основному поясу меняет текст сообщения о закрытии
+        points = {horizon_start}
+        for offset in range(HORIZON_DAYS + 1):
+            points.add(self._at(first + timedelta(days=offset), 0, self.default_tz))
+        for start, end in merged:
+            points.update((start, end))
+        bounds = sorted(p for p in points if horizon_start <= p < horizon_end)
+
+        starts, states, messages = [], [], []
+        span = 0
+        for point in bounds:
+            while span < len(merged) and merged[span][1] <= point:
+                span += 1
+            is_open = span < len(merged) and merged[span][0] <= point
+            message = None
+            if not is_open:
+                local_day = datetime.fromtimestamp(point, self.default_tz).date()
+                message = self.message_for(local_day)
+            if states and states[-1] == is_open and messages[-1] == message:
+                continue
+            starts.append(point)
+            states.append(is_open)
+            messages.append(message)
+
+        changes = [None] * len(starts)
+        for index in range(len(starts) - 2, -1, -1):
+            if states[index + 1] != states[index]:
+                changes[index] = starts[index + 1]
+            else:
+                changes[index] = changes[index + 1]
+
+        return starts, states, messages, changes, horizon_end
+
+    @staticmethod
+    def _at(day: date, minutes: int, tz) -> float:
+        day += timedelta(days=minutes // MINUTES_PER_DAY)
+        minutes %= MINUTES_PER_DAY
+        return datetime.combine(day, time(minutes // 60, minutes % 60), tzinfo=tz).timestamp()
+
+    def _lookup(self, now: Optional[datetime]) -> tuple[int, tuple]:
+        timestamp = (now or datetime.now(timezone.utc)).timestamp()
+        table = self._table
+        starts, horizon_end = table[0], table[4]
+        if not starts or timestamp < starts[0] or timestamp >= horizon_end - 86400:
+            moment = datetime.fromtimestamp(timestamp, self.default_tz)
+            table = self._table = self._build(moment.date())
+            starts = table[0]
+        return bisect.bisect_right(starts, timestamp) - 1, table
+
+    def status(self, now: Optional[datetime] = None) -> tuple[bool, Optional[str]]:
+        """Открыто ли сейчас и сообщение для закрытого состояния"""
+        with timing.phase("schedule"):
+            index, (_, states, messages, _, _) = self._lookup(now)
+        return states[index], messages[index]
+
+    def next_change(self, now: Optional[datetime] = None) -> Optional[datetime]:
+        """Момент ближайшей смены открыто/закрыто (None - не в пределах горизонта)"""
+        index, (_, _, _, changes, _) = self._lookup(now)
+        change = changes[index]
+        return datetime.fromtimestamp(change, timezone.utc) if change is not None else None
+
+
+def compile_schedule(
+    working_hours: Iterable, overrides: Iterable, default_tz: ZoneInfo
+) -> CompiledSchedule:
+    by_weekday: dict[int, list] = {}
+    for row in working_hours:
+        by_weekday.setdefault(row.day_of_week, []).append(row)
+
+    by_day: dict[date, list] = {}
+    for row in overrides:
+        by_day.setdefault(row.day, []).append(row)
+
+    return CompiledSchedule(
+        weekly={weekday: build_rule(rows, default_tz) for weekday, rows in by_weekday.items()},
+        overrides={day: build_rule(rows, default_tz) for day, rows in by_day.items()},
+        default_tz=default_tz,
+    )
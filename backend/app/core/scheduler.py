@@ -0,0 +1,89 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+
+from . import routing
+from ..db import async_crud
+from ..db.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Страховка от сдвигов системных часов: даже без границ просыпаемся раз в час
+MAX_SLEEP = 3600.0
+RETRY_DELAY = 5.0
+
+
+class RedirectScheduler:
+    """Переключение ссылок по valid_from/valid_until.
+
+    Каждый воркер спит до ближайшей границы из снапшота и в этот момент
+    пересчитывает готовый ответ в памяти. Затем в БД включается наступившая
+    запланированная ссылка и снимается истёкшая; advisory-лок в
+    apply_redirect_schedule делает это однократным для всех воркеров.
+    """
+
+    def __init__(self):
+        self._changed = asyncio.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def notify(self, snapshot=None) -> None:
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._changed.set)
+
+    async def _apply(self, snapshot: routing.RoutingSnapshot, now: datetime) -> bool:
+        due = any(
+            redirect.valid_from <= now for redirect in snapshot.queued
+        ) or any(redirect.valid_until < now for redirect in snapshot.redirects)
+        if not due:
+            return True
+
+        try:
+            async with AsyncSessionLocal() as db:
+                await async_crud.apply_redirect_schedule(db, now)
+        except Exception:
+            logger.exception("Failed to apply redirect schedule")
+            return False
+        return True
+
+    async def _run(self) -> None:
+        while True:
+            self._changed.clear()
+            timeout = MAX_SLEEP
+
+            try:
+                snapshot = routing.get_snapshot()
+            except RuntimeError:
+                snapshot = None
+
+            if snapshot is not None:
+                now = datetime.now(timezone.utc)
+                routing.refresh_current(now)
+                applied = await self._apply(snapshot, now)
+
+                boundary = snapshot.next_boundary(now)
+                if boundary is not None:
+                    timeout = min(max((boundary - now).total_seconds(), 0), MAX_SLEEP)
+                if not applied:
+                    timeout = min(timeout, RETRY_DELAY)
+
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+scheduler = RedirectScheduler()
@@ -0,0 +1,156 @@
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import exc
+
+from .config import settings
+from ..db import async_crud
+from ..db.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Классы SQLSTATE, после которых пачку повторяем целиком: нет связи, сервер
+# перегружен или останавливается, конфликт транзакций
+_TRANSIENT_SQLSTATE_CLASSES = ("08", "40", "53", "57")
+
+
+def is_transient(error: Exception) -> bool:
+    """Ошибка базы, а не строк: повтор той же пачки позже может пройти"""
+    if isinstance(error, (exc.OperationalError, exc.InterfaceError, exc.TimeoutError, OSError, asyncio.TimeoutError)):
+        return True
+    # asyncpg-ошибки SQLAlchemy оборачивает в общий DBAPIError, различает их только SQLSTATE
+    sqlstate = getattr(getattr(error, "orig", None), "sqlstate", None) or ""
+    return sqlstate[:2] in _TRANSIENT_SQLSTATE_CLASSES
+
+
+class SessionBuffer:
+    """Отложенная пакетная запись платёжных сессий.
+
+    Запросы только кладут строку в очередь; фоновая задача пишет пачками
+    по размеру или по таймеру. Если Postgres не успевает и очередь
+    заполнена, новые строки отбрасываются и учитываются в dropped.
+    Пачка, которую отверг сам Postgres (например, сумма вне Numeric(12, 2)),
+    пишется по одной строке; негодные строки учитываются в rejected.
+    """
+
+    def __init__(self, max_size: int, batch_size: int, flush_interval: float):
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.rejected = 0
+        self.flushed = 0
+        self._rows: deque[dict] = deque()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._rows)
+
+    def add(
+        self,
+        session_id: str,
+        kind: str,
+        redirect_id: Optional[int],
+        amount: Optional[Decimal] = None,
+        target_id: Optional[int] = None,
+    ) -> None:
+        if len(self._rows) >= self.max_size:
+            self.dropped += 1
+            return
+
+        self._rows.append(
+            {
+                "session_id": session_id,
+                "kind": kind,
+                "redirect_id": redirect_id,
+                "target_id": target_id,
+                "amount": amount,
+                "created_at": datetime.now(timezone.utc),
+            }
+        )
+        if len(self._rows) >= self.batch_size:
+            self._wakeup.set()
+
+    async def flush(self) -> None:
+        while self._rows:
+            batch = [self._rows.popleft() for _ in range(min(self.batch_size, len(self._rows)))]
+            try:
+                await self._insert(batch)
+            except asyncio.CancelledError:
+                self._requeue(batch)
+                raise
+            except Exception as e:
+                if is_transient(e):
+                    logger.exception("Failed to flush %d payment sessions", len(batch))
+                    self._requeue(batch)
+                    return
+                logger.warning("Batch of %d payment sessions rejected (%s), inserting row by row", len(batch), getattr(e, "orig", e))
+                if not await self._flush_rows(batch):
+                    return
+                continue
+            self.flushed += len(batch)
+
+    async def _flush_rows(self, batch: list[dict]) -> bool:
+        """Вставка по одной строке; False — база недоступна, остаток вернули в очередь"""
+        for index, row in enumerate(batch):
+            try:
+                await self._insert([row])
+            except asyncio.CancelledError:
+                self._requeue(batch[index:])
+                raise
+            except Exception as e:
+                if is_transient(e):
+                    logger.exception("Failed to flush %d payment sessions", len(batch) - index)
+                    self._requeue(batch[index:])
+                    return False
+                logger.error("Dropping payment session %s: %s", row["session_id"], getattr(e, "orig", e))
+                self.rejected += 1
+            else:
+                self.flushed += 1
+        return True
+
+    @staticmethod
+    async def _insert(rows: list[dict]) -> None:
+        async with AsyncSessionLocal() as db:
+            await async_crud.create_payment_sessions(db, rows)
+
+    def _requeue(self, batch: list[dict]) -> None:
+        room = self.max_size - len(self._rows)
+        if room < len(batch):
+            self.dropped += len(batch) - room
+            batch = batch[len(batch) - room:] if room > 0 else []
+        self._rows.extendleft(reversed(batch))
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        await self.flush()
+
+
+buffer = SessionBuffer(
+    max_size=settings.SESSION_BUFFER_MAX_SIZE,
+    batch_size=settings.SESSION_FLUSH_BATCH_SIZE,
+    flush_interval=settings.SESSION_FLUSH_INTERVAL,
+)
@@ -0,0 +1,107 @@
+import base64
+import binascii
+import hashlib
+import hmac
+import os
+import struct
+import time
+from decimal import Decimal
+from typing import NamedTuple, Optional
+
+from .config import settings
+
+# Версия, id ключа, выдан (unix, с), срок (с), id ссылки, сумма в копейках (0 — без суммы)
+_CLAIMS = struct.Struct("<BBIHQQ")
+_NONCE_SIZE = 6
+_TAG_SIZE = 12
+_TOKEN_SIZE = _CLAIMS.size + _NONCE_SIZE + _TAG_SIZE
+_VERSION = 1
+# Ключ сессий отделён от секрета JWT, даже когда выводится из него
+_KEY_CONTEXT = b"payment-session-token"
+
+
+class TokenExpired(ValueError):
+    pass
+
+
+class SessionClaims(NamedTuple):
+    key_id: int
+    issued_at: int
+    expires_at: int
+    redirect_id: int
+    amount: Optional[Decimal]
+
+
+def _derive(secret: str) -> bytes:
+    return hmac.new(secret.encode(), _KEY_CONTEXT, hashlib.sha256).digest()
+
+
+def load_keys(spec: str, fallback_secret: str) -> tuple[int, dict[int, bytes]]:
+    """SESSION_TOKEN_KEYS вида "2:новый,1:старый": первым подписываем, остальными только проверяем.
+
+    Пустая строка — один ключ с id 0, выведенный из JWT_SECRET_KEY.
+    """
+    if not spec.strip():
+        return 0, {0: _derive(fallback_secret)}
+
+    signing_key_id, keys = None, {}
+    for entry in spec.split(","):
+        key_id, separator, secret = entry.strip().partition(":")
+        if not separator or not secret or not key_id.isdigit() or int(key_id) > 255:
+            raise ValueError("SESSION_TOKEN_KEYS: ожидается список id:секрет с id от 0 до 255")
+        if signing_key_id is None:
+            signing_key_id = int(key_id)
+        keys.setdefault(int(key_id), _derive(secret))
+    return signing_key_id, keys
+
+
+_signing_key_id, _keys = load_keys(settings.SESSION_TOKEN_KEYS, settings.JWT_SECRET_KEY)
+
+
+def _tag(key: bytes, payload: bytes) -> bytes:
+    # hmac.digest считает за один вызов OpenSSL, без Python-объекта hmac.HMAC
+    return hmac.digest(key, payload, "sha256")[:_TAG_SIZE]
+
+
+def issue(redirect_id: Optional[int], amount: Optional[Decimal] = None, now: Optional[float] = None) -> str:
+    """Подписанный session_id: 56 символов base64url, влезает в String(64) и JSON без экранирования.
+
+    ValueError, если id ссылки или сумма не помещаются в поля токена.
+    """
+    issued_at = int(time.time() if now is None else now)
+    kopecks = int((amount * 100).to_integral_value()) if amount else 0
+    try:
+        claims = _CLAIMS.pack(
+            _VERSION, _signing_key_id, issued_at, settings.SESSION_TOKEN_TTL, redirect_id or 0, kopecks
+        )
+    except struct.error as e:
+        raise ValueError("session token claims out of range") from e
+    payload = claims + os.urandom(_NONCE_SIZE)
+    token = payload + _tag(_keys[_signing_key_id], payload)
+    return base64.urlsafe_b64encode(token).rstrip(b"=").decode()
+
+
+def verify(token: str, now: Optional[float] = None) -> SessionClaims:
+    """Проверка без БД: ValueError для чужого или повреждённого токена, TokenExpired — для истёкшего"""
+    try:
+        raw = base64.urlsafe_b64decode(token.encode() + b"=" * (-len(token) % 4))
+    except (binascii.Error, UnicodeError, ValueError) as e:
+        raise ValueError("invalid session token") from e
+    if len(raw) != _TOKEN_SIZE:
+        raise ValueError("invalid session token")
+
+    payload, tag = raw[:-_TAG_SIZE], raw[-_TAG_SIZE:]
+    version, key_id, issued_at, ttl, redirect_id, kopecks = _CLAIMS.unpack_from(payload)
+    key = _keys.get(key_id)
+    if version != _VERSION or key is None or not hmac.compare_digest(tag, _tag(key, payload)):
+        raise ValueError("invalid session token")
+
+    if issued_at + ttl <= (time.time() if now is None else now):
+        raise TokenExpired("session token expired")
+    return SessionClaims(
+        key_id=key_id,
+        issued_at=issued_at,
+        expires_at=issued_at + ttl,
+        redirect_id=redirect_id,
+        amount=Decimal(kopecks).scaleb(-2) if kopecks else None,
+    )
@@ -0,0 +1,47 @@
+import mmap
+import os
+import tempfile
+from typing import Optional
+
+import orjson
+
+
+def save(path: str, document: dict) -> None:
+    """Атомарная запись: временный файл в том же каталоге, fsync и os.replace"""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".snapshot-")
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            tmp.write(orjson.dumps(document))
+            tmp.flush()
+            os.fsync(tmp.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def load(path: str) -> Optional[tuple[dict, float]]:
+    """Прочитать файл через read-only mmap; вернуть документ и время подтверждения (mtime)"""
+    try:
+        with open(path, "rb") as file:
+            stat = os.fstat(file.fileno())
+            if stat.st_size == 0:
+                return None
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return orjson.loads(mapped[:]), stat.st_mtime
+    except FileNotFoundError:
+        return None
+
+
+def touch(path: str) -> None:
+    """Отметить, что содержимое всё ещё совпадает с БД"""
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,140 @@
+import asyncio
+import json
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Optional
+
+from fastapi.responses import ORJSONResponse
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# Фазы текущего запроса в миллисекундах; словарь общий для задачи и потоков threadpool
+_phases: ContextVar[Optional[dict]] = ContextVar("request_phases", default=None)
+
+
+def add(name: str, elapsed: float) -> None:
+    phases = _phases.get()
+    if phases is not None:
+        phases[name] = phases.get(name, 0.0) + elapsed * 1000
+
+
+@contextmanager
+def phase(name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        add(name, time.perf_counter() - started)
+
+
+class TimedJSONResponse(ORJSONResponse):
+    def render(self, content) -> bytes:
+        with phase("encode"):
+            return super().render(content)
+
+
+def server_timing(phases: dict, total: float) -> str:
+    entries = [f"{name};dur={duration:.2f}" for name, duration in phases.items()]
+    entries.append(f"total;dur={total:.2f}")
+    return ", ".join(entries)
+
+
+class TimingMiddleware:
+    """Разбивка запроса по фазам: заголовок Server-Timing, лог медленных
+    запросов и выборочное профилирование в speedscope-файлы.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._profile_dir = Path(settings.PROFILE_DIR)
+        self._profiler_available = True
+        # pyinstrument не профилирует два запроса одного потока одновременно
+        self._profiling = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        phases: dict = {}
+        token = _phases.set(phases)
+        started = time.perf_counter()
+        status = 500
+        streaming = False
+        profiler = self._start_profiler()
+
+        async def send_wrapper(message):
+            nonlocal status, streaming, profiler
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                for key, value in message.get("headers", ()):
+                    if key == b"content-type" and value.startswith(b"text/event-stream"):
+                        streaming = True
+                # SSE живёт минутами: не держим под профайлером и не считаем медленным
+                if streaming and profiler is not None:
+                    profiler.stop()
+                    profiler, self._profiling = None, False
+                if settings.SERVER_TIMING_ENABLED:
+                    total = (time.perf_counter() - started) * 1000
+                    message["headers"] = list(message.get("headers", ())) + [
+                        (b"server-timing", server_timing(phases, total).encode())
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            total = (time.perf_counter() - started) * 1000
+            _phases.reset(token)
+            if profiler is not None:
+                await self._dump_profile(profiler, scope)
+            if not streaming and total >= settings.SLOW_REQUEST_THRESHOLD_MS:
+                logger.warning(
+                    json.dumps(
+                        {
+                            "event": "slow_request",
+                            "method": scope["method"],
+                            "path": scope["path"],
+                            "status": status,
+                            "duration_ms": round(total, 2),
+                            "phases": {name: round(value, 2) for name, value in phases.items()},
+                        }
+                    )
+                )
+
+    def _start_profiler(self):
+        if not self._profiler_available or self._profiling:
+            return None
+        if random.random() >= settings.PROFILE_SAMPLE_RATE:
+            return None
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            logger.warning("PROFILE_SAMPLE_RATE is set but pyinstrument is not installed")
+            self._profiler_available = False
+            return None
+
+        profiler = Profiler(interval=0.001, async_mode="enabled")
+        profiler.start()
+        self._profiling = True
+        return profiler
+
+    async def _dump_profile(self, profiler, scope) -> None:
+        from pyinstrument.renderers import SpeedscopeRenderer
+
+        profiler.stop()
+        self._profiling = False
+        name = scope["path"].strip("/").replace("/", "_") or "root"
+        path = self._profile_dir / f"{time.time():.6f}-{scope['method']}-{name}.speedscope.json"
+        try:
+            output = profiler.output(SpeedscopeRenderer())
+            self._profile_dir.mkdir(parents=True, exist_ok=True)
+            await asyncio.to_thread(path.write_text, output)
+        except Exception:
+            logger.exception("Failed to write profile %s", path)
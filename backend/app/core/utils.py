@@ -1,33 +1,6 @@
+import base64
 from datetime import datetime
 from typing import Optional
-from sqlalchemy.orm import Session
-from ..db import crud
-
-
-def is_working_hours(db: Session, moscow_tz) -> tuple[bool, Optional[str]]:
-
-    now = datetime.now(moscow_tz)
-
-    working_config = crud.get_working_hours_by_day(db, now.weekday())
-
-    if not working_config or not working_config.is_enabled:
-        return False, f"Сегодня ({get_day_name(now.weekday())}) не рабочий день"
-
-    try:
-        work_start = datetime.strptime(working_config.work_start, "%H:%M").time()
-        work_end = datetime.strptime(working_config.work_end, "%H:%M").time()
-    except ValueError:
-        return False, "Ошибка в конфигурации рабочего времени"
-
-    current_time = now.time()
-
-    if work_start <= current_time <= work_end:
-        return True, None
-    else:
-        return (
-            False,
-            f"Рабочее время: {working_config.work_start} - {working_config.work_end}",
-        )
 
 
 def get_day_name(day_of_week: int) -> str:
@@ -40,4 +13,25 @@ def get_day_name(day_of_week: int) -> str:
         "Суббота",
         "Воскресенье",
     ]
-    return days[day_of_week] if 0 <= day_of_week <= 6 else "Неизвестно"
\ No newline at end of file
+    return days[day_of_week] if 0 <= day_of_week <= 6 else "Неизвестно"
+
+
+def encode_cursor(created_at: datetime, id: int) -> str:
+    """Непрозрачный курсор истории ссылок: позиция (created_at, id) последней строки"""
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """ValueError, если курсор повреждён"""
+    try:
+        created_at, id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(id)
+    except (UnicodeError, ValueError, TypeError) as e:
+        raise ValueError("invalid cursor") from e
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return any(tag in (etag, "*") for tag in candidates)
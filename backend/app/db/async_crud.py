@@ -0,0 +1,258 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date, datetime, timezone
+from typing import AsyncIterator, Optional, List
+from ..db import models, queries
+from ..api.schemas.payment_link import (
+    DynamicPaymentURLCreate,
+    DynamicPaymentURLFilter,
+    RedirectTargetCreate,
+)
+from ..api.schemas.workhours import WorkingHoursUpdate, ScheduleOverrideCreate
+
+
+async def notify_routing_changed(db: AsyncSession) -> None:
+    """Оповестить воркеры об изменении маршрутизации (доставляется при commit)"""
+    await db.execute(queries.NOTIFY_ROUTING_CHANGED)
+
+
+async def release_active_dynamic_url(db: AsyncSession) -> None:
+    """Снять флаг с текущей активной ссылки, не трогая остальную историю.
+
+    Смены активной ссылки сериализуются advisory-локом транзакции, строка
+    ищется по частичному уникальному индексу и блокируется FOR UPDATE.
+    """
+    await db.execute(queries.ACTIVATION_LOCK)
+    result = await db.execute(queries.active_dynamic_url_id_for_update())
+    current_id = result.scalar_one_or_none()
+
+    if current_id is not None:
+        await db.execute(queries.deactivate_dynamic_url(current_id))
+
+
+async def get_routing_version(db: AsyncSession) -> int:
+    result = await db.execute(queries.ROUTING_VERSION)
+    return result.scalar_one()
+
+
+async def get_active_dynamic_url(db: AsyncSession) -> Optional[models.DynamicPaymentURL]:
+    result = await db.scalars(queries.active_dynamic_url(datetime.now(timezone.utc)))
+    return result.first()
+
+
+async def get_active_dynamic_urls(db: AsyncSession) -> List[models.DynamicPaymentURL]:
+    result = await db.scalars(queries.active_dynamic_urls())
+    return list(result.all())
+
+
+async def get_queued_dynamic_urls(db: AsyncSession) -> List[models.DynamicPaymentURL]:
+    result = await db.scalars(queries.queued_dynamic_urls(datetime.now(timezone.utc)))
+    return list(result.all())
+
+
+async def get_dynamic_url(db: AsyncSession, id: int) -> Optional[models.DynamicPaymentURL]:
+    return await db.get(models.DynamicPaymentURL, id)
+
+
+async def get_all_dynamic_urls(
+    db: AsyncSession,
+    limit: int = 100,
+    after: Optional[tuple[datetime, int]] = None,
+    filters: Optional[DynamicPaymentURLFilter] = None,
+) -> List[models.DynamicPaymentURL]:
+    """Страница истории от новых к старым; after — (created_at, id) последней строки"""
+    result = await db.scalars(queries.dynamic_url_page(limit, after, filters))
+    return list(result.all())
+
+
+async def stream_dynamic_urls(
+    db: AsyncSession,
+    filters: Optional[DynamicPaymentURLFilter] = None,
+    batch_size: int = 1000,
+) -> AsyncIterator:
+    """Вся история через серверный курсор: в памяти не больше batch_size строк"""
+    result = await db.stream(queries.dynamic_url_export(filters, batch_size))
+    async for row in result:
+        yield row
+
+
+async def create_dynamic_url(
+    db: AsyncSession,
+    url_data: DynamicPaymentURLCreate,
+) -> models.DynamicPaymentURL:
+
+    new_url = queries.new_dynamic_url(url_data, datetime.now(timezone.utc))
+    if new_url.is_active:
+        await release_active_dynamic_url(db)
+
+    db.add(new_url)
+    await notify_routing_changed(db)
+    await db.commit()
+    await db.refresh(new_url)
+
+    return new_url
+
+
+async def create_dynamic_urls(
+    db: AsyncSession, urls_data: List[DynamicPaymentURLCreate]
+) -> List[models.DynamicPaymentURL]:
+    """Пакет ссылок одной транзакцией: один INSERT ссылок, один INSERT целей, одно оповещение.
+
+    Действующей сейчас может быть не больше одной ссылки пакета, остальные ставятся в очередь.
+    """
+    rows = queries.dynamic_url_rows(urls_data, datetime.now(timezone.utc))
+    if any(row["is_active"] for row in rows):
+        await release_active_dynamic_url(db)
+
+    result = await db.scalars(queries.insert_dynamic_urls(), rows)
+    created = result.all()
+
+    insert_targets = queries.insert_redirect_targets(created, urls_data)
+    if insert_targets is not None:
+        await db.execute(insert_targets)
+
+    await notify_routing_changed(db)
+    await db.commit()
+    return created
+
+
+async def toggle_redirect_status(
+    db: AsyncSession, redirect: models.DynamicPaymentURL
+) -> models.DynamicPaymentURL:
+
+    activate = not redirect.is_active
+
+    if activate:
+        await release_active_dynamic_url(db)
+
+    redirect.is_active = activate
+    redirect.auto_activate = False
+    await notify_routing_changed(db)
+    await db.commit()
+    await db.refresh(redirect)
+
+    return redirect
+
+
+
+async def replace_redirect_targets(
+    db: AsyncSession,
+    redirect: models.DynamicPaymentURL,
+    targets: List[RedirectTargetCreate],
+) -> models.DynamicPaymentURL:
+    """Заменить набор целей; пустой список возвращает ссылку к одной target_url"""
+    redirect.targets = [models.RedirectTarget(**target.model_dump()) for target in targets]
+    await notify_routing_changed(db)
+    await db.commit()
+    await db.refresh(redirect)
+    return redirect
+
+async def apply_redirect_schedule(db: AsyncSession, now: datetime) -> bool:
+    """Включить наступившую запланированную ссылку и снять истёкшую активную"""
+    await db.execute(queries.ACTIVATION_LOCK)
+
+    result = await db.scalars(queries.due_dynamic_urls(now))
+    due = list(result.all())
+    live = [url for url in due if queries.as_utc(url.valid_until) > now]
+
+    if live:
+        await release_active_dynamic_url(db)
+    for url in due:
+        url.auto_activate = False
+    if live:
+        live[0].is_active = True
+
+    expired = await db.execute(queries.expire_active_dynamic_urls(now))
+    changed = bool(due) or expired.rowcount > 0
+
+    if changed:
+        await notify_routing_changed(db)
+    await db.commit()
+    return changed
+
+
+async def delete_dynamic_url(
+    db: AsyncSession,
+    id: int
+) -> bool:
+    existing = await db.get(models.DynamicPaymentURL, id)
+    if not existing:
+        return False
+    await db.delete(existing)
+    await notify_routing_changed(db)
+    await db.commit()
+    return True
+
+
+async def get_working_hours_by_day(
+    db: AsyncSession, day_of_week: int
+) -> List[models.WorkingHours]:
+    result = await db.scalars(queries.working_hours_by_day(day_of_week))
+    return list(result.all())
+
+
+async def get_all_working_hours(db: AsyncSession) -> List[models.WorkingHours]:
+    result = await db.scalars(queries.all_working_hours())
+    return list(result.all())
+
+
+async def replace_working_hours(
+    db: AsyncSession, hours: List[WorkingHoursUpdate]
+) -> List[models.WorkingHours]:
+    """Заменить интервалы переданных дней одной транзакцией и одним оповещением.
+
+    Дни, которых нет в hours, не меняются.
+    """
+    await db.execute(queries.delete_working_hours(interval.day_of_week for interval in hours))
+    result = await db.scalars(queries.insert_working_hours(hours))
+    updated = sorted(result.all(), key=lambda interval: (interval.day_of_week, interval.work_start))
+    await notify_routing_changed(db)
+    await db.commit()
+    return updated
+
+
+async def update_or_create_working_hours(
+    db: AsyncSession, hours_data: WorkingHoursUpdate
+) -> models.WorkingHours:
+    """Один интервал на день: прежние интервалы этого дня удаляются"""
+    return (await replace_working_hours(db, [hours_data]))[0]
+
+
+async def get_schedule_overrides(
+    db: AsyncSession, since: Optional[date] = None
+) -> List[models.ScheduleOverride]:
+    result = await db.scalars(queries.schedule_overrides(since))
+    return list(result.all())
+
+
+async def create_schedule_override(
+    db: AsyncSession, override_data: ScheduleOverrideCreate
+) -> models.ScheduleOverride:
+    override = models.ScheduleOverride(**override_data.model_dump())
+    db.add(override)
+    await notify_routing_changed(db)
+    await db.commit()
+    await db.refresh(override)
+    return override
+
+
+async def delete_schedule_override(db: AsyncSession, id: int) -> bool:
+    existing = await db.get(models.ScheduleOverride, id)
+    if not existing:
+        return False
+    await db.delete(existing)
+    await notify_routing_changed(db)
+    await db.commit()
+    return True
+
+
+async def create_payment_sessions(db: AsyncSession, rows: List[dict]) -> None:
+    await db.execute(queries.insert_payment_sessions(rows))
+    await db.commit()
+
+
+async def get_target_hits(
+    db: AsyncSession, redirect_id: int, since: Optional[datetime] = None
+) -> dict[Optional[int], int]:
+    """Число сессий по целям ссылки (target_id None - без выбора цели)"""
+    result = await db.execute(queries.target_hits(redirect_id, since))
+    return dict(result.all())
@@ -1,36 +1,44 @@
+"""Синхронные обёртки над queries для кода вне event loop.
+
+Загрузка снимка маршрутизации в потоке и бенчмарки; ручки API работают
+через async_crud.
+"""
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from datetime import datetime
+from datetime import date, datetime, timezone
 from typing import Optional, List
-from ..db import models
+from ..db import models, queries
 from ..api.schemas.payment_link import DynamicPaymentURLCreate
 from ..api.schemas.workhours import WorkingHoursUpdate
 
-def get_active_dynamic_url(db: Session) -> Optional[models.DynamicPaymentURL]:
-    now = datetime.utcnow()
-    return (
-        db.query(models.DynamicPaymentURL)
-        .filter(
-            and_(
-                models.DynamicPaymentURL.valid_from <= now,
-                models.DynamicPaymentURL.valid_until >= now,
-                models.DynamicPaymentURL.is_active == True,
-            )
-        )
-        .first()
-    )
 
+def notify_routing_changed(db: Session) -> None:
+    """Оповестить воркеры об изменении маршрутизации (доставляется при commit)"""
+    db.execute(queries.NOTIFY_ROUTING_CHANGED)
+
+
+def release_active_dynamic_url(db: Session) -> None:
+    """Снять флаг с текущей активной ссылки, не трогая остальную историю"""
+    db.execute(queries.ACTIVATION_LOCK)
+    current_id = db.execute(queries.active_dynamic_url_id_for_update()).scalar_one_or_none()
+
+    if current_id is not None:
+        db.execute(queries.deactivate_dynamic_url(current_id))
+
+
+def get_routing_version(db: Session) -> int:
+    return db.execute(queries.ROUTING_VERSION).scalar_one()
 
-def get_all_dynamic_urls(
-    db: Session, limit: int = 100
-) -> List[models.DynamicPaymentURL]:
-    """Получить все динамические ссылки"""
-    return (
-        db.query(models.DynamicPaymentURL)
-        .order_by(models.DynamicPaymentURL.created_at.desc())
-        .limit(limit)
-        .all()
-    )
+
+def get_active_dynamic_urls(db: Session) -> List[models.DynamicPaymentURL]:
+    return list(db.scalars(queries.active_dynamic_urls()).all())
+
+
+def get_queued_dynamic_urls(db: Session) -> List[models.DynamicPaymentURL]:
+    return list(db.scalars(queries.queued_dynamic_urls(datetime.now(timezone.utc))).all())
+
+
+def get_dynamic_url(db: Session, id: int) -> Optional[models.DynamicPaymentURL]:
+    return db.get(models.DynamicPaymentURL, id)
 
 
 def create_dynamic_url(
@@ -38,68 +46,55 @@ def create_dynamic_url(
     url_data: DynamicPaymentURLCreate,
 ) -> models.DynamicPaymentURL:
 
-    db.query(models.DynamicPaymentURL).update({"is_active": False})
-
-    new_url = models.DynamicPaymentURL(
-        target_url=url_data.target_url,
-        valid_from=url_data.valid_from,
-        valid_until=url_data.valid_until,
-        is_active=True,
-        name=url_data.name,
-    )
+    new_url = queries.new_dynamic_url(url_data, datetime.now(timezone.utc))
+    if new_url.is_active:
+        release_active_dynamic_url(db)
 
     db.add(new_url)
+    notify_routing_changed(db)
     db.commit()
     db.refresh(new_url)
 
     return new_url
 
-def delete_dynamic_url(
-    db: Session,
-    id: int
-) -> bool:
-    existing = db.query(models.DynamicPaymentURL).get(id)
-    if not existing:
-        return False
-    db.delete(existing)
+
+def toggle_redirect_status(
+    db: Session, redirect: models.DynamicPaymentURL
+) -> models.DynamicPaymentURL:
+
+    activate = not redirect.is_active
+
+    if activate:
+        release_active_dynamic_url(db)
+
+    redirect.is_active = activate
+    redirect.auto_activate = False
+    notify_routing_changed(db)
     db.commit()
-    return True
-
-def get_working_hours_by_day(
-    db: Session, day_of_week: int
-) -> Optional[models.WorkingHours]:
-    return (
-        db.query(models.WorkingHours)
-        .filter(models.WorkingHours.day_of_week == day_of_week)
-        .first()
-    )
+    db.refresh(redirect)
+
+    return redirect
 
 
 def get_all_working_hours(db: Session) -> List[models.WorkingHours]:
-    return db.query(models.WorkingHours).order_by(models.WorkingHours.day_of_week).all()
-
-
-def update_or_create_working_hours(
-    db: Session, hours_data: WorkingHoursUpdate
-) -> models.WorkingHours:
-
-    existing = get_working_hours_by_day(db, hours_data.day_of_week)
-
-    if existing:
-        existing.work_start = hours_data.work_start
-        existing.work_end = hours_data.work_end
-        existing.is_enabled = hours_data.is_enabled
-        db.commit()
-        db.refresh(existing)
-        return existing
-    else:
-        new_hours = models.WorkingHours(
-            day_of_week=hours_data.day_of_week,
-            work_start=hours_data.work_start,
-            work_end=hours_data.work_end,
-            is_enabled=hours_data.is_enabled,
-        )
-        db.add(new_hours)
-        db.commit()
-        db.refresh(new_hours)
-        return new_hours
+    return list(db.scalars(queries.all_working_hours()).all())
+
+
+def replace_working_hours(
+    db: Session, hours: List[WorkingHoursUpdate]
+) -> List[models.WorkingHours]:
+    """Заменить интервалы переданных дней одной транзакцией и одним оповещением"""
+    db.execute(queries.delete_working_hours(interval.day_of_week for interval in hours))
+    updated = sorted(
+        db.scalars(queries.insert_working_hours(hours)).all(),
+        key=lambda interval: (interval.day_of_week, interval.work_start),
+    )
+    notify_routing_changed(db)
+    db.commit()
+    return updated
+
+
+def get_schedule_overrides(
+    db: Session, since: Optional[date] = None
+) -> List[models.ScheduleOverride]:
+    return list(db.scalars(queries.schedule_overrides(since)).all())
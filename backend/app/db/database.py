@@ -1,12 +1,67 @@
+import time
+
+from fastapi import Request, Response
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from ..core.config import settings
+from ..core.metrics import instrument_engine, timed_pool
+
+# Cookie с моментом, до которого чтения админа идут в основную БД
+READ_YOUR_WRITES_COOKIE = "rw_until"
+
+# Соединения к основной БД на один воркер: одно держит LISTEN снапшота,
+# синхронный движок грузит снапшот, остальное — асинхронные запросы
+_PRIMARY_PER_WORKER = max(settings.DB_CONNECTION_BUDGET // settings.WORKERS, 4)
+_SYNC_CONNECTIONS = 2
+_ASYNC_CONNECTIONS = _PRIMARY_PER_WORKER - _SYNC_CONNECTIONS - 1
+_READ_CONNECTIONS = max(settings.DB_READ_CONNECTION_BUDGET // settings.WORKERS, 2)
+
+
+def _pool_limits(connections: int) -> dict:
+    pool_size = max(connections // 2, 1)
+    return {"pool_size": pool_size, "max_overflow": connections - pool_size}
+
 
 engine = create_engine(
-    settings.DATABASE_URL, pool_pre_ping=True, pool_size=10, max_overflow=20
+    settings.DATABASE_URL,
+    pool_pre_ping=True,
+    poolclass=timed_pool(QueuePool, "sync"),
+    **_pool_limits(_SYNC_CONNECTIONS),
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+instrument_engine(engine, "sync")
+
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL,
+    pool_pre_ping=True,
+    poolclass=timed_pool(AsyncAdaptedQueuePool, "async"),
+    **_pool_limits(_ASYNC_CONNECTIONS),
+)
+
+instrument_engine(async_engine.sync_engine, "async")
+
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+# Без реплики читаем через тот же пул, чтобы не удваивать число соединений
+if settings.DB_REPLICA_HOST:
+    async_read_engine = create_async_engine(
+        settings.ASYNC_READ_DATABASE_URL,
+        pool_pre_ping=True,
+        poolclass=timed_pool(AsyncAdaptedQueuePool, "read"),
+        **_pool_limits(_READ_CONNECTIONS),
+    )
+    instrument_engine(async_read_engine.sync_engine, "read")
+    AsyncReadSessionLocal = async_sessionmaker(
+        async_read_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+    )
+else:
+    async_read_engine = async_engine
+    AsyncReadSessionLocal = AsyncSessionLocal
 
 class Base(DeclarativeBase):
     pass
@@ -18,3 +73,33 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db(response: Response):
+    """Сессия основной БД для изменений; следующие чтения админа тоже пойдут в неё"""
+    window = settings.READ_YOUR_WRITES_WINDOW
+    response.set_cookie(
+        READ_YOUR_WRITES_COOKIE,
+        str(int(time.time()) + window),
+        max_age=window,
+        path="/api/admin",
+        httponly=True,
+        samesite="lax",
+    )
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def reading_own_writes(request: Request) -> bool:
+    """Админ недавно что-то менял: реплика и снапшот воркера могут ещё отставать"""
+    try:
+        return float(request.cookies.get(READ_YOUR_WRITES_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+async def get_async_read_db(request: Request):
+    """Сессия реплики, кроме окна сразу после правки админа"""
+    session_factory = AsyncSessionLocal if reading_own_writes(request) else AsyncReadSessionLocal
+    async with session_factory() as db:
+        yield db
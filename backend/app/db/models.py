@@ -1,11 +1,18 @@
 from sqlalchemy import (
+    BigInteger,
     Column,
     Integer,
+    Numeric,
     String,
+    Date,
     DateTime,
     Boolean,
-    Text,
+    ForeignKey,
+    Index,
+    UniqueConstraint,
+    text,
 )
+from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..db.database import Base
 
@@ -14,23 +21,109 @@ class DynamicPaymentURL(Base):
     __tablename__ = "dynamic_payment_urls"
 
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String(200), index=True)
+    name = Column(String(200))
     target_url = Column(String(500), nullable=False)
     valid_from = Column(DateTime(timezone=True), nullable=False)
     valid_until = Column(DateTime(timezone=True), nullable=False)
     is_active = Column(Boolean, default=True, index=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    auto_activate = Column(Boolean, nullable=False, default=False, server_default=text("false"))
     supports_amount = Column(Boolean, default=True)
     amount_parameter = Column(String(20), default="sum")
 
+    targets = relationship(
+        "RedirectTarget",
+        lazy="selectin",
+        order_by="RedirectTarget.id",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+
+    __table_args__ = (
+        Index(
+            "uq_dynamic_payment_urls_single_active",
+            "is_active",
+            unique=True,
+            postgresql_where=text("is_active"),
+        ),
+        # Ключ курсора истории и поиск по префиксу названия
+        Index("ix_dynamic_payment_urls_created_at_id", "created_at", "id"),
+        Index(
+            "ix_dynamic_payment_urls_name_prefix",
+            "name",
+            postgresql_ops={"name": "varchar_pattern_ops"},
+        ),
+        # Очередь планировщика: единицы строк среди всей истории
+        Index(
+            "ix_dynamic_payment_urls_queued",
+            "valid_from",
+            postgresql_where=text("auto_activate AND NOT is_active"),
+        ),
+    )
+
+
+class RedirectTarget(Base):
+    __tablename__ = "redirect_targets"
+
+    id = Column(Integer, primary_key=True, index=True)
+    redirect_id = Column(
+        Integer,
+        ForeignKey("dynamic_payment_urls.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    target_url = Column(String(500), nullable=False)
+    weight = Column(Integer, nullable=False, default=1)
+    is_enabled = Column(Boolean, nullable=False, default=True, server_default=text("true"))
+
 
 class WorkingHours(Base):
     __tablename__ = "working_hours"
 
     id = Column(Integer, primary_key=True, index=True)
-    day_of_week = Column(Integer, index=True)
+    day_of_week = Column(Integer, nullable=False)
     work_start = Column(String(5))
     work_end = Column(String(5))
     is_enabled = Column(Boolean, default=True)
     timezone = Column(String(50), default="Europe/Moscow")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Строка — один интервал, у дня их может быть несколько; сохраняется день целиком
+    __table_args__ = (
+        UniqueConstraint("day_of_week", "work_start", name="uq_working_hours_day_start"),
+    )
+
+
+class ScheduleOverride(Base):
+    __tablename__ = "schedule_overrides"
+
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False, index=True)
+    work_start = Column(String(5))
+    work_end = Column(String(5))
+    is_enabled = Column(Boolean, default=False)
+    timezone = Column(String(50), default="Europe/Moscow")
+    name = Column(String(200))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class PaymentSession(Base):
+    __tablename__ = "payment_sessions"
+
+    id = Column(BigInteger, primary_key=True)
+    session_id = Column(String(64), nullable=False, index=True)
+    kind = Column(String(20), nullable=False)
+    redirect_id = Column(Integer)
+    target_id = Column(Integer)
+    amount = Column(Numeric(12, 2))
+    created_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    # Статистика целей ссылки читается только из индекса, без обхода таблицы
+    __table_args__ = (
+        Index(
+            "ix_payment_sessions_redirect_id_created_at",
+            "redirect_id",
+            "created_at",
+            postgresql_include=["target_id"],
+        ),
+    )
@@ -0,0 +1,261 @@
+"""Запросы к БД, общие для crud и async_crud.
+
+Здесь только построение выражений и строк для вставки; модули crud
+выполняют их на своей сессии и решают, когда делать commit.
+"""
+from sqlalchemy import (
+    Delete, Insert, Select, Update, and_, delete, func, insert, select, text, tuple_, update
+)
+from datetime import date, datetime, timezone
+from typing import Iterable, Optional, List, Sequence
+from ..db import models
+from ..api.schemas.payment_link import DynamicPaymentURLCreate, DynamicPaymentURLFilter
+from ..api.schemas.workhours import WorkingHoursUpdate
+from ..core.config import ACTIVATION_LOCK_KEY, ROUTING_CHANNEL
+
+
+# До первого nextval() last_value уже 1, отличает его только is_called:
+# без этого первая правка после миграции не меняет версию
+ROUTING_VERSION = text(
+    "SELECT CASE WHEN is_called THEN last_value ELSE 0 END FROM routing_version_seq"
+)
+
+# Оповещение доставляется воркерам при commit
+NOTIFY_ROUTING_CHANGED = text(
+    "SELECT pg_notify(:channel, nextval('routing_version_seq')::text)"
+).bindparams(channel=ROUTING_CHANNEL)
+
+# Смены активной ссылки сериализуются advisory-локом транзакции
+ACTIVATION_LOCK = text("SELECT pg_advisory_xact_lock(:key)").bindparams(key=ACTIVATION_LOCK_KEY)
+
+
+def as_utc(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def active_dynamic_url_id_for_update() -> Select:
+    """id текущей активной ссылки по частичному уникальному индексу, строка блокируется"""
+    return (
+        select(models.DynamicPaymentURL.id)
+        .where(models.DynamicPaymentURL.is_active == True)
+        .with_for_update()
+    )
+
+
+def deactivate_dynamic_url(id: int) -> Update:
+    return (
+        update(models.DynamicPaymentURL)
+        .where(models.DynamicPaymentURL.id == id)
+        .values(is_active=False)
+    )
+
+
+def active_dynamic_url(now: datetime) -> Select:
+    return (
+        select(models.DynamicPaymentURL)
+        .filter(
+            and_(
+                models.DynamicPaymentURL.valid_from <= now,
+                models.DynamicPaymentURL.valid_until >= now,
+                models.DynamicPaymentURL.is_active == True,
+            )
+        )
+        .limit(1)
+    )
+
+
+def active_dynamic_urls() -> Select:
+    return (
+        select(models.DynamicPaymentURL)
+        .filter(models.DynamicPaymentURL.is_active == True)
+        .order_by(models.DynamicPaymentURL.created_at.desc())
+    )
+
+
+def queued_dynamic_urls(now: datetime) -> Select:
+    return (
+        select(models.DynamicPaymentURL)
+        .filter(
+            and_(
+                models.DynamicPaymentURL.auto_activate == True,
+                models.DynamicPaymentURL.is_active == False,
+                models.DynamicPaymentURL.valid_until > now,
+            )
+        )
+        .order_by(models.DynamicPaymentURL.valid_from)
+    )
+
+
+def _dynamic_url_conditions(filters: Optional[DynamicPaymentURLFilter]) -> list:
+    url = models.DynamicPaymentURL
+    if filters is None:
+        return []
+    conditions = []
+    if filters.name:
+        # Префикс без подстановочных символов, чтобы работал индекс varchar_pattern_ops
+        prefix = filters.name.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        conditions.append(url.name.like(f"{prefix}%", escape="\\"))
+    if filters.is_active is not None:
+        conditions.append(url.is_active == filters.is_active)
+    if filters.overlaps_from is not None:
+        conditions.append(url.valid_until > as_utc(filters.overlaps_from))
+    if filters.overlaps_until is not None:
+        conditions.append(url.valid_from < as_utc(filters.overlaps_until))
+    return conditions
+
+
+def dynamic_url_page(
+    limit: int,
+    after: Optional[tuple[datetime, int]],
+    filters: Optional[DynamicPaymentURLFilter],
+) -> Select:
+    """Страница истории от новых к старым; after — (created_at, id) последней строки"""
+    url = models.DynamicPaymentURL
+    query = select(url).where(*_dynamic_url_conditions(filters))
+    if after is not None:
+        query = query.where(tuple_(url.created_at, url.id) < tuple_(*after))
+    return query.order_by(url.created_at.desc(), url.id.desc()).limit(limit)
+
+
+def dynamic_url_export(filters: Optional[DynamicPaymentURLFilter], batch_size: int) -> Select:
+    """Вся история строками таблицы, без ORM-объектов, для серверного курсора"""
+    table = models.DynamicPaymentURL.__table__
+    return (
+        select(table)
+        .where(*_dynamic_url_conditions(filters))
+        .order_by(table.c.created_at.desc(), table.c.id.desc())
+        .execution_options(yield_per=batch_size)
+    )
+
+
+def _dynamic_url_row(url_data: DynamicPaymentURLCreate, now: datetime) -> dict:
+    # Ссылка с началом в будущем ставится в очередь и включается планировщиком
+    queued = as_utc(url_data.valid_from) > now
+    return {
+        "target_url": url_data.target_url,
+        "valid_from": url_data.valid_from,
+        "valid_until": url_data.valid_until,
+        "is_active": not queued,
+        "auto_activate": queued,
+        "name": url_data.name,
+        "supports_amount": url_data.supports_amount,
+        "amount_parameter": url_data.amount_parameter,
+    }
+
+
+def _target_rows(url_data: DynamicPaymentURLCreate) -> List[dict]:
+    """Цели ссылки: основная target_url первой, пусто — ссылка без балансировки"""
+    if not url_data.targets:
+        return []
+    return [
+        {"target_url": url_data.target_url, "weight": url_data.weight, "is_enabled": True}
+    ] + [target.model_dump() for target in url_data.targets]
+
+
+def new_dynamic_url(url_data: DynamicPaymentURLCreate, now: datetime) -> models.DynamicPaymentURL:
+    """Ещё не добавленная в сессию ссылка с целями"""
+    new_url = models.DynamicPaymentURL(**_dynamic_url_row(url_data, now))
+    new_url.targets = [models.RedirectTarget(**target) for target in _target_rows(url_data)]
+    return new_url
+
+
+def dynamic_url_rows(urls_data: List[DynamicPaymentURLCreate], now: datetime) -> List[dict]:
+    return [_dynamic_url_row(url_data, now) for url_data in urls_data]
+
+
+def insert_dynamic_urls() -> Insert:
+    # insertmanyvalues собирает строки в один INSERT и сохраняет их порядок в RETURNING
+    return insert(models.DynamicPaymentURL).returning(
+        models.DynamicPaymentURL, sort_by_parameter_order=True
+    )
+
+
+def insert_redirect_targets(
+    created: Sequence[models.DynamicPaymentURL], urls_data: List[DynamicPaymentURLCreate]
+) -> Optional[Insert]:
+    """Один INSERT целей для пакета ссылок; None, если целей нет"""
+    targets = [
+        {"redirect_id": new_url.id, **target}
+        for new_url, url_data in zip(created, urls_data)
+        for target in _target_rows(url_data)
+    ]
+    return insert(models.RedirectTarget).values(targets) if targets else None
+
+
+def due_dynamic_urls(now: datetime) -> Select:
+    """Наступившие запланированные ссылки, самая поздняя первой"""
+    return (
+        select(models.DynamicPaymentURL)
+        .filter(
+            and_(
+                models.DynamicPaymentURL.auto_activate == True,
+                models.DynamicPaymentURL.is_active == False,
+                models.DynamicPaymentURL.valid_from <= now,
+            )
+        )
+        .order_by(models.DynamicPaymentURL.valid_from.desc())
+        .with_for_update()
+    )
+
+
+def expire_active_dynamic_urls(now: datetime) -> Update:
+    return (
+        update(models.DynamicPaymentURL)
+        .where(
+            and_(
+                models.DynamicPaymentURL.is_active == True,
+                models.DynamicPaymentURL.valid_until < now,
+            )
+        )
+        .values(is_active=False)
+    )
+
+
+def working_hours_by_day(day_of_week: int) -> Select:
+    return (
+        select(models.WorkingHours)
+        .filter(models.WorkingHours.day_of_week == day_of_week)
+        .order_by(models.WorkingHours.work_start)
+    )
+
+
+def all_working_hours() -> Select:
+    return select(models.WorkingHours).order_by(
+        models.WorkingHours.day_of_week, models.WorkingHours.work_start
+    )
+
+
+def delete_working_hours(days: Iterable[int]) -> Delete:
+    return delete(models.WorkingHours).where(models.WorkingHours.day_of_week.in_(set(days)))
+
+
+def insert_working_hours(hours: List[WorkingHoursUpdate]) -> Insert:
+    """Интервалы дней одним INSERT, строки возвращаются созданными"""
+    return (
+        insert(models.WorkingHours)
+        .values([interval.model_dump() for interval in hours])
+        .returning(models.WorkingHours)
+    )
+
+
+def schedule_overrides(since: Optional[date]) -> Select:
+    query = select(models.ScheduleOverride)
+    if since is not None:
+        query = query.filter(models.ScheduleOverride.day >= since)
+    return query.order_by(models.ScheduleOverride.day, models.ScheduleOverride.id)
+
+
+def insert_payment_sessions(rows: List[dict]) -> Insert:
+    return insert(models.PaymentSession).values(rows)
+
+
+def target_hits(redirect_id: int, since: Optional[datetime]) -> Select:
+    """Число сессий по целям ссылки (target_id None - без выбора цели)"""
+    query = (
+        select(models.PaymentSession.target_id, func.count())
+        .where(models.PaymentSession.redirect_id == redirect_id)
+        .group_by(models.PaymentSession.target_id)
+    )
+    if since is not None:
+        query = query.where(models.PaymentSession.created_at >= since)
+    return query
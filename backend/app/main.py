@@ -1,10 +1,36 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from .core import admission, metrics, ratelimit, responses, routing, session_buffer, timing
+from .core.broadcaster import broadcaster
+from .core.scheduler import scheduler
 from .core.config import settings
 from .api import router as api_router
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    routing.on_reload(responses.clear)
+    routing.on_reload(scheduler.notify)
+    routing.on_reload(broadcaster.notify)
+    routing.start()
+    session_buffer.buffer.start()
+    scheduler.start()
+    broadcaster.start()
+    metrics.loop_lag.start()
+    yield
+    await metrics.loop_lag.stop()
+    await broadcaster.stop()
+    await scheduler.stop()
+    await session_buffer.buffer.stop()
+    routing.stop()
+
+
 app = FastAPI(
     debug=settings.DEBUG,
+    lifespan=lifespan,
+    default_response_class=timing.TimedJSONResponse,
     docs_url=None if not settings.DEBUG else "/docs",
     redoc_url=None if not settings.DEBUG else "/redoc"
 )
@@ -12,16 +38,38 @@ app = FastAPI(
 
 app.include_router(api_router)
 
+# Внутри CORS: ответы 429 и 503 тоже получают CORS-заголовки;
+# отсечённые по частоте запросы не занимают слоты адаптивного лимита
+app.add_middleware(admission.AdmissionMiddleware)
+app.add_middleware(ratelimit.RateLimitMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[settings.FRONTEND_URL, "http://127.0.0.1:3000"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
+app.add_middleware(metrics.MetricsMiddleware)
+app.add_middleware(timing.TimingMiddleware)
 
 @app.get("/health")
 async def health_check():
     return {
         "status": "healthy",
+        "session_buffer": {
+            "pending": session_buffer.buffer.pending,
+            "flushed": session_buffer.buffer.flushed,
+            "dropped": session_buffer.buffer.dropped,
+            "rejected": session_buffer.buffer.rejected,
+        },
+        "event_subscribers": broadcaster.subscribers,
+        "admission": admission.state(),
+        "routing": routing.freshness(),
     }
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    content, media_type = metrics.render()
+    return Response(content, media_type=media_type)
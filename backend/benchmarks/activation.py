@@ -0,0 +1,133 @@
+"""Cost of switching the active redirect as history grows.
+
+Seeds inactive "bench-activation-*" rows up to --rows, then times
+crud.toggle_redirect_status activations. --legacy also times the old
+full-table `UPDATE is_active = false` for comparison. The redirect that
+was active before the run is re-activated at the end.
+
+    python -m benchmarks.activation --rows 1000000 --activations 50 --legacy
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+
+from sqlalchemy import func, text
+
+from app.db import crud, models
+from app.db.database import SessionLocal
+
+PREFIX = "bench-activation-"
+
+
+def seed(db, rows: int) -> list[int]:
+    existing = db.query(func.count(models.DynamicPaymentURL.id)).filter(
+        models.DynamicPaymentURL.name.like(f"{PREFIX}%")
+    ).scalar()
+    if existing < rows:
+        db.execute(
+            text(
+                """
+                INSERT INTO dynamic_payment_urls
+                    (name, target_url, valid_from, valid_until, is_active, created_at,
+                     supports_amount, amount_parameter)
+                SELECT :prefix || g, 'https://bench.example/pay/' || g,
+                       now() - interval '1 day', now() + interval '1 day', false,
+                       now() - g * interval '1 second', true, 'sum'
+                FROM generate_series(:start, :stop) AS g
+                """
+            ),
+            {"prefix": PREFIX, "start": existing + 1, "stop": rows},
+        )
+        db.commit()
+        db.execute(text("ANALYZE dynamic_payment_urls"))
+        db.commit()
+
+    return [
+        row_id
+        for (row_id,) in db.query(models.DynamicPaymentURL.id)
+        .filter(models.DynamicPaymentURL.name.like(f"{PREFIX}%"))
+        .order_by(func.random())
+        .limit(1000)
+    ]
+
+
+def time_activation(db, ids: list[int], count: int) -> list[float]:
+    timings = []
+    for row_id in random.sample(ids, count):
+        redirect = crud.get_dynamic_url(db, row_id)
+        if redirect.is_active:
+            continue
+        started = time.perf_counter()
+        crud.toggle_redirect_status(db, redirect)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def time_legacy(db, ids: list[int], count: int) -> list[float]:
+    timings = []
+    for row_id in random.sample(ids, count):
+        started = time.perf_counter()
+        db.query(models.DynamicPaymentURL).update({"is_active": False})
+        db.query(models.DynamicPaymentURL).filter(
+            models.DynamicPaymentURL.id == row_id
+        ).update({"is_active": True})
+        db.commit()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def summary(timings: list[float]) -> dict:
+    return {
+        "runs": len(timings),
+        "median_ms": round(statistics.median(timings) * 1000, 2),
+        "max_ms": round(max(timings) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--activations", type=int, default=50)
+    parser.add_argument("--legacy", action="store_true")
+    parser.add_argument("--cleanup", action="store_true")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        previous = crud.get_active_dynamic_urls(db)
+        ids = seed(db, args.rows)
+        total = db.query(func.count(models.DynamicPaymentURL.id)).scalar()
+
+        result = {
+            "rows": total,
+            "activation": summary(time_activation(db, ids, args.activations)),
+        }
+        if args.legacy:
+            result["legacy_full_update"] = summary(
+                time_legacy(db, ids, min(args.activations, 5))
+            )
+
+        if previous:
+            redirect = crud.get_dynamic_url(db, previous[0].id)
+            if not redirect.is_active:
+                crud.toggle_redirect_status(db, redirect)
+        else:
+            crud.release_active_dynamic_url(db)
+            crud.notify_routing_changed(db)
+            db.commit()
+
+        if args.cleanup:
+            db.query(models.DynamicPaymentURL).filter(
+                models.DynamicPaymentURL.name.like(f"{PREFIX}%")
+            ).delete(synchronize_session=False)
+            db.commit()
+    finally:
+        db.close()
+
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Concurrent-request throughput against a running gateway.
+
+    python -m benchmarks.concurrency --url http://127.0.0.1:8000/api/admin/dynamic-redirects \
+        --token "$TOKEN" --concurrency 50 --requests 2000
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+
+
+async def run(url: str, token: str, concurrency: int, total: int) -> dict:
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    latencies = []
+    errors = 0
+    queue = asyncio.Queue()
+    for _ in range(total):
+        queue.put_nowait(None)
+
+    async with httpx.AsyncClient(headers=headers, timeout=30) as client:
+        async def worker():
+            nonlocal errors
+            while not queue.empty():
+                queue.get_nowait()
+                started = time.perf_counter()
+                try:
+                    response = await client.get(url)
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "url": url,
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "rps": round(total / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", required=True)
+    parser.add_argument("--token", default="")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args.url, args.token, args.concurrency, args.requests))
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
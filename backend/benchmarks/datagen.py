@@ -0,0 +1,193 @@
+"""Synthetic production-scale data for plan and load testing.
+
+Appends "synthetic-*" rows: redirect history going back in time (every
+redirect valid for 1-14 days, every tenth split across extra targets), a
+few queued future redirects, schedule overrides and payment sessions whose
+redirect_id is skewed towards recent redirects the way real traffic is.
+Everything is generated server-side with generate_series in --batch sized
+statements, then the touched tables are vacuumed and analyzed. The active redirect and
+working hours are left alone.
+
+    python -m benchmarks.datagen --redirects 1000000 --sessions 5000000
+    python -m benchmarks.datagen --drop
+"""
+import argparse
+import json
+import sys
+import time
+
+from sqlalchemy import text
+
+from app.db.database import engine
+
+PREFIX = "synthetic-"
+CHANNELS = ("sbp", "card", "qr", "sber", "tinkoff")
+
+
+def batches(total: int, size: int):
+    for start in range(1, total + 1, size):
+        yield start, min(start + size - 1, total)
+
+
+def insert_redirects(conn, total: int, batch: int) -> tuple[int, int]:
+    # Offset continues the timeline of earlier runs instead of overlapping it
+    offset = conn.execute(
+        text("SELECT count(*) FROM dynamic_payment_urls WHERE name LIKE :prefix"),
+        {"prefix": f"{PREFIX}%"},
+    ).scalar_one()
+    first_id = None
+    # Oldest rows first, so ids grow with created_at as they do in production
+    for start, stop in reversed(list(batches(total, batch))):
+        ids = conn.execute(
+            text(
+                """
+                INSERT INTO dynamic_payment_urls
+                    (name, target_url, valid_from, valid_until, is_active, auto_activate,
+                     created_at, supports_amount, amount_parameter)
+                SELECT :prefix || (:channels)[1 + n % 5] || '-' || n,
+                       'https://pay.example/' || (:channels)[1 + n % 5] || '/' || n,
+                       ends - (1 + n % 14) * interval '1 day',
+                       ends,
+                       false, false,
+                       ends - (1 + n % 14) * interval '1 day' - (n % 3600) * interval '1 second',
+                       n % 7 <> 0,
+                       'sum'
+                FROM generate_series(:start, :stop) AS g,
+                     LATERAL (SELECT g + :offset AS n) AS numbered,
+                     LATERAL (SELECT now() - n * interval '10 minutes' AS ends) AS w
+                ORDER BY n DESC
+                RETURNING id
+                """
+            ),
+            {
+                "prefix": PREFIX,
+                "channels": list(CHANNELS),
+                "start": start,
+                "stop": stop,
+                "offset": offset,
+            },
+        ).scalars().all()
+        first_id = first_id or min(ids)
+        conn.commit()
+        progress("redirects", total - start + 1, total)
+    last_id = conn.execute(text("SELECT max(id) FROM dynamic_payment_urls")).scalar_one()
+
+    conn.execute(
+        text(
+            """
+            INSERT INTO redirect_targets (redirect_id, target_url, weight, is_enabled)
+            SELECT u.id, u.target_url || '?split=' || t, 1 + t, t < 3
+            FROM dynamic_payment_urls u, generate_series(1, 3) AS t
+            WHERE u.id BETWEEN :first AND :last AND u.id % 10 = 0
+            """
+        ),
+        {"first": first_id, "last": last_id},
+    )
+    conn.commit()
+    return first_id, last_id
+
+
+def insert_queued(conn, total: int) -> None:
+    conn.execute(
+        text(
+            """
+            INSERT INTO dynamic_payment_urls
+                (name, target_url, valid_from, valid_until, is_active, auto_activate,
+                 created_at, supports_amount, amount_parameter)
+            SELECT :prefix || 'queued-' || g, 'https://pay.example/queued/' || g,
+                   now() + g * interval '1 day', now() + (g + 1) * interval '1 day',
+                   false, true, now(), true, 'sum'
+            FROM generate_series(1, :total) AS g
+            """
+        ),
+        {"prefix": PREFIX, "total": total},
+    )
+    conn.execute(
+        text(
+            """
+            INSERT INTO schedule_overrides (day, work_start, work_end, is_enabled, timezone, name)
+            SELECT current_date + g * 30, '10:00', '15:00', g % 2 = 0, 'Europe/Moscow',
+                   :prefix || 'override-' || g
+            FROM generate_series(-24, 12) AS g
+            """
+        ),
+        {"prefix": PREFIX},
+    )
+    conn.commit()
+
+
+def insert_sessions(conn, total: int, batch: int, first_id: int, last_id: int) -> None:
+    span = last_id - first_id
+    for start, stop in batches(total, batch):
+        conn.execute(
+            text(
+                """
+                INSERT INTO payment_sessions
+                    (session_id, kind, redirect_id, target_id, amount, created_at)
+                SELECT :prefix || md5(g::text || clock_timestamp()::text),
+                       CASE WHEN g % 3 = 0 THEN 'qr' ELSE 'link' END,
+                       -- cube of random(): most sessions land on the newest redirects
+                       :last - floor(power(random(), 3) * :span)::int,
+                       NULL,
+                       CASE WHEN g % 4 = 0 THEN round((random() * 50000)::numeric, 2) END,
+                       now() - power(random(), 2) * interval '365 days'
+                FROM generate_series(:start, :stop) AS g
+                """
+            ),
+            {"prefix": PREFIX, "start": start, "stop": stop, "last": last_id, "span": span},
+        )
+        conn.commit()
+        progress("sessions", stop, total)
+
+
+def drop(conn) -> None:
+    conn.execute(
+        text("DELETE FROM payment_sessions WHERE session_id LIKE :prefix"), {"prefix": f"{PREFIX}%"}
+    )
+    conn.execute(
+        text("DELETE FROM schedule_overrides WHERE name LIKE :prefix"), {"prefix": f"{PREFIX}%"}
+    )
+    conn.execute(
+        text("DELETE FROM dynamic_payment_urls WHERE name LIKE :prefix"), {"prefix": f"{PREFIX}%"}
+    )
+    conn.commit()
+
+
+def progress(what: str, done: int, total: int) -> None:
+    print(f"{what}: {done}/{total}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--redirects", type=int, default=1_000_000)
+    parser.add_argument("--sessions", type=int, default=5_000_000)
+    parser.add_argument("--queued", type=int, default=50)
+    parser.add_argument("--batch", type=int, default=250_000)
+    parser.add_argument("--drop", action="store_true", help="delete all synthetic rows and exit")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    with engine.connect() as conn:
+        if args.drop:
+            drop(conn)
+        else:
+            first_id, last_id = insert_redirects(conn, args.redirects, args.batch)
+            insert_queued(conn, args.queued)
+            if args.sessions:
+                insert_sessions(conn, args.sessions, args.batch, first_id, last_id)
+
+        # VACUUM sets the visibility map like autovacuum would, so index-only scans count
+        maintenance = conn.execution_options(isolation_level="AUTOCOMMIT")
+        for table in ("dynamic_payment_urls", "redirect_targets", "schedule_overrides", "payment_sessions"):
+            maintenance.exec_driver_sql(f"VACUUM ANALYZE {table}")
+
+        counts = {
+            table: conn.execute(text(f"SELECT count(*) FROM {table}")).scalar_one()
+            for table in ("dynamic_payment_urls", "redirect_targets", "payment_sessions")
+        }
+
+    print(json.dumps({"seconds": round(time.perf_counter() - started, 1), "rows": counts}))
+
+
+if __name__ == "__main__":
+    main()
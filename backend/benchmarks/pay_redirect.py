@@ -0,0 +1,78 @@
+"""In-process latency of the /pay redirect: the ASGI app is called directly,
+so the numbers exclude sockets and HTTP client overhead.
+
+    python -m benchmarks.pay_redirect --requests 5000 --amount 1500
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from app.core import routing
+from app.main import app
+
+
+async def call(query: bytes) -> dict:
+    response = {}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = dict(message["headers"])
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/pay",
+        "raw_path": b"/pay",
+        "root_path": "",
+        "query_string": query,
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("127.0.0.1", 8000),
+    }
+    await app(scope, receive, send)
+    return response
+
+
+async def run(total: int, amount: str) -> dict:
+    routing.reload_snapshot()
+    query = f"amount={amount}".encode() if amount else b""
+    latencies = []
+
+    for _ in range(200):
+        await call(query)
+
+    for _ in range(total):
+        started = time.perf_counter()
+        response = await call(query)
+        latencies.append(time.perf_counter() - started)
+
+    latencies.sort()
+    return {
+        "query": query.decode(),
+        "status": response["status"],
+        "location": response["headers"].get(b"location", b"").decode(),
+        "requests": total,
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 3),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--amount", default="1500")
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args.requests, args.amount)), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
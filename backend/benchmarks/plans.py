@@ -0,0 +1,336 @@
+"""EXPLAIN (ANALYZE, BUFFERS) regression check for every crud query.
+
+Each case calls the real app.db.async_crud functions the API runs, on a
+session bound to one outer transaction that is rolled back at the end (crud commits become
+savepoints), so nothing is changed and no NOTIFY is delivered. Every
+statement a case sends is recorded and re-run under EXPLAIN (ANALYZE,
+BUFFERS, FORMAT JSON) inside its own savepoint. The run fails when a plan
+sequentially scans a table estimated at more than --seqscan-rows rows or a
+statement's execution time exceeds its budget.
+
+Meant to run against benchmarks.datagen volumes. Prints a JSON report and
+exits 1 on any violation, so it can gate a migration or query change.
+
+    python -m benchmarks.datagen --redirects 1000000 --sessions 5000000
+    python -m benchmarks.plans --budget-ms 50 --output plans.json
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import sys
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.schemas.payment_link import (
+    DynamicPaymentURLCreate,
+    DynamicPaymentURLFilter,
+    RedirectTargetCreate,
+)
+from app.api.schemas.workhours import ScheduleOverrideCreate, WorkingHoursUpdate
+from app.db import async_crud as crud, models
+from app.db.database import async_engine
+
+SKIPPED_PREFIXES = ("SAVEPOINT", "RELEASE", "ROLLBACK", "EXPLAIN")
+SKIPPED_CALLS = ("pg_advisory_xact_lock", "pg_notify")
+NO_BUDGET = float("inf")
+
+
+@dataclass
+class Case:
+    name: str
+    run: Callable[[AsyncSession], Awaitable[object]]
+    # None means --budget-ms; NO_BUDGET for statements that read everything by design
+    budget_ms: Optional[float] = None
+    # Full scans that are the point of the query, e.g. the history export
+    allow_seqscan: frozenset = field(default_factory=frozenset)
+
+
+async def probe(db: AsyncSession) -> dict:
+    """Representative ids and cursor positions from the current data"""
+    newest = (await crud.get_all_dynamic_urls(db, limit=1))[0]
+    middle = (await db.execute(
+        text(
+            "SELECT id, created_at FROM dynamic_payment_urls"
+            " ORDER BY created_at DESC, id DESC"
+            " OFFSET (SELECT count(*) / 2 FROM dynamic_payment_urls) LIMIT 1"
+        )
+    )).one()
+    busiest = (await db.execute(
+        text(
+            "SELECT redirect_id FROM payment_sessions"
+            " WHERE created_at > now() - interval '1 day'"
+            " GROUP BY redirect_id ORDER BY count(*) DESC LIMIT 1"
+        )
+    )).scalar() or newest.id
+    return {"newest": newest.id, "middle": middle.id, "middle_cursor": (middle.created_at, middle.id), "busiest": busiest}
+
+
+def cases(ids: dict) -> list[Case]:
+    now = datetime.now(timezone.utc)
+    month_ago = now - timedelta(days=30)
+
+    def new_url(name: str, starts: datetime) -> DynamicPaymentURLCreate:
+        return DynamicPaymentURLCreate(
+            name=f"plans-{name}",
+            target_url=f"https://plans.example/{name}",
+            valid_from=starts,
+            valid_until=starts + timedelta(days=1),
+        )
+
+    async def toggle(db):
+        await crud.toggle_redirect_status(db, await crud.get_dynamic_url(db, ids["middle"]))
+
+    async def override_roundtrip(db):
+        override = await crud.create_schedule_override(
+            db, ScheduleOverrideCreate(day=date.today() + timedelta(days=400), name="plans")
+        )
+        await crud.delete_schedule_override(db, override.id)
+
+    async def replace_targets(db):
+        await crud.replace_redirect_targets(
+            db,
+            await crud.get_dynamic_url(db, ids["newest"]),
+            [RedirectTargetCreate(target_url="https://plans.example/target", weight=2)],
+        )
+
+    async def export_page(db):
+        rows = []
+        async with contextlib.aclosing(crud.stream_dynamic_urls(db)) as stream:
+            async for row in stream:
+                rows.append(row)
+                if len(rows) == 1000:
+                    break
+        return rows
+
+    async def replace_hours(db):
+        await crud.replace_working_hours(
+            db,
+            [
+                WorkingHoursUpdate(day_of_week=day.day_of_week, work_start=day.work_start,
+                                   work_end=day.work_end, is_enabled=day.is_enabled)
+                for day in await crud.get_all_working_hours(db)
+            ]
+            or [WorkingHoursUpdate(day_of_week=0, work_start="10:00", work_end="21:00")],
+        )
+
+    return [
+        Case("routing_version", crud.get_routing_version),
+        Case("active_url", crud.get_active_dynamic_url),
+        Case("active_urls", crud.get_active_dynamic_urls),
+        Case("queued_urls", crud.get_queued_dynamic_urls),
+        Case("url_by_id", lambda db: crud.get_dynamic_url(db, ids["middle"])),
+        Case("history_first_page", lambda db: crud.get_all_dynamic_urls(db, 100)),
+        Case(
+            "history_deep_page",
+            lambda db: crud.get_all_dynamic_urls(db, 100, after=ids["middle_cursor"]),
+        ),
+        Case(
+            "history_name_prefix",
+            lambda db: crud.get_all_dynamic_urls(
+                db, 100, filters=DynamicPaymentURLFilter(name="synthetic-sbp-12")
+            ),
+        ),
+        Case(
+            "history_active_only",
+            lambda db: crud.get_all_dynamic_urls(db, 100, filters=DynamicPaymentURLFilter(is_active=True)),
+        ),
+        Case(
+            "history_overlap",
+            lambda db: crud.get_all_dynamic_urls(
+                db,
+                100,
+                filters=DynamicPaymentURLFilter(
+                    overlaps_from=month_ago, overlaps_until=month_ago + timedelta(days=1)
+                ),
+            ),
+        ),
+        Case(
+            "history_export",
+            export_page,
+            budget_ms=NO_BUDGET,
+            allow_seqscan=frozenset({"dynamic_payment_urls"}),
+        ),
+        Case("working_hours_by_day", lambda db: crud.get_working_hours_by_day(db, 0)),
+        Case("working_hours", crud.get_all_working_hours),
+        Case("schedule_overrides", lambda db: crud.get_schedule_overrides(db, date.today())),
+        Case("target_hits", lambda db: crud.get_target_hits(db, ids["busiest"])),
+        Case(
+            "target_hits_since",
+            lambda db: crud.get_target_hits(db, ids["busiest"], now - timedelta(days=1)),
+        ),
+        Case("apply_schedule", lambda db: crud.apply_redirect_schedule(db, now)),
+        Case("toggle_redirect", toggle),
+        Case("create_url", lambda db: crud.create_dynamic_url(db, new_url("single", now + timedelta(days=900)))),
+        Case(
+            "create_urls_bulk",
+            lambda db: crud.create_dynamic_urls(
+                db, [new_url(f"bulk-{i}", now + timedelta(days=900 + i)) for i in range(10)]
+            ),
+        ),
+        Case("replace_targets", replace_targets),
+        Case("replace_working_hours", replace_hours),
+        Case("schedule_override_roundtrip", override_roundtrip),
+        Case(
+            "create_payment_sessions",
+            lambda db: crud.create_payment_sessions(
+                db,
+                [
+                    {"session_id": f"plans-{i}", "kind": "link", "redirect_id": ids["newest"],
+                     "target_id": None, "amount": None, "created_at": now}
+                    for i in range(100)
+                ],
+            ),
+        ),
+        Case("delete_url", lambda db: crud.delete_dynamic_url(db, ids["middle"])),
+    ]
+
+
+def walk(node: dict):
+    yield node
+    for child in node.get("Plans", ()):
+        yield from walk(child)
+
+
+def explain(conn, statement: str, parameters) -> dict:
+    savepoint = conn.begin_nested()
+    try:
+        result = conn.exec_driver_sql(
+            "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + statement, parameters
+        ).scalar_one()
+    finally:
+        savepoint.rollback()
+    return (json.loads(result) if isinstance(result, str) else result)[0]
+
+
+def check(conn, case: Case, statements: list, table_rows: dict, args) -> dict:
+    budget = case.budget_ms if case.budget_ms is not None else args.budget_ms
+    report = {"case": case.name, "statements": [], "violations": []}
+
+    for statement, parameters in statements:
+        plan = explain(conn, statement, parameters)
+        nodes = list(walk(plan["Plan"]))
+        seqscans = sorted(
+            {
+                node["Relation Name"]
+                for node in nodes
+                if node["Node Type"] == "Seq Scan"
+                and table_rows.get(node["Relation Name"], 0) > args.seqscan_rows
+                and node["Relation Name"] not in case.allow_seqscan
+            }
+        )
+        execution_ms = plan["Execution Time"]
+        entry = {
+            "sql": " ".join(statement.split())[:300],
+            "execution_ms": round(execution_ms, 3),
+            "planning_ms": round(plan["Planning Time"], 3),
+            "shared_hit_blocks": plan["Plan"].get("Shared Hit Blocks", 0),
+            "shared_read_blocks": plan["Plan"].get("Shared Read Blocks", 0),
+            "nodes": sorted({node["Node Type"] for node in nodes}),
+        }
+        report["statements"].append(entry)
+
+        for table in seqscans:
+            report["violations"].append(f"seq scan on {table}: {entry['sql'][:120]}")
+        if budget and execution_ms > budget:
+            report["violations"].append(
+                f"{execution_ms:.1f} ms > {budget} ms budget: {entry['sql'][:120]}"
+            )
+
+    return report
+
+
+async def collect(args) -> tuple[dict, list]:
+    captured: Optional[list] = None
+
+    def capture(connection, cursor, statement, parameters, context, executemany):
+        if captured is None:
+            return
+        head = statement.lstrip().upper()
+        if head.startswith(SKIPPED_PREFIXES) or any(call in statement for call in SKIPPED_CALLS):
+            return
+        # executemany is explained with its first parameter set; insertmanyvalues
+        # batches arrive already rendered with a single parameter set
+        if executemany and isinstance(parameters, list):
+            parameters = parameters[0]
+        captured.append((statement, parameters))
+
+    async with async_engine.connect() as conn:
+        table_rows = dict(
+            (
+                await conn.execute(
+                    text(
+                        "SELECT relname, reltuples::bigint FROM pg_class"
+                        " WHERE relkind = 'r' AND relnamespace = 'public'::regnamespace"
+                    )
+                )
+            ).all()
+        )
+        await conn.rollback()
+        event.listen(conn.sync_connection, "before_cursor_execute", capture)
+
+        outer = await conn.begin()
+        db = AsyncSession(bind=conn, join_transaction_mode="create_savepoint")
+        try:
+            ids = await probe(db)
+            selected = cases(ids)
+            if args.cases:
+                wanted = set(args.cases.split(","))
+                selected = [case for case in selected if case.name in wanted]
+
+            reports = []
+            for case in selected:
+                captured = []
+                await case.run(db)
+                await db.flush()
+                statements, captured = captured, None
+                reports.append(await conn.run_sync(check, case, statements, table_rows, args))
+                db.expire_all()
+        finally:
+            await db.close()
+            await outer.rollback()
+
+    return table_rows, reports
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget-ms", type=float, default=50, help="per statement execution time")
+    parser.add_argument("--seqscan-rows", type=int, default=10_000,
+                        help="seq scans of tables estimated above this many rows fail")
+    parser.add_argument("--cases", help="comma-separated subset of case names")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    table_rows, reports = asyncio.run(collect(args))
+
+    violations = [f"{r['case']}: {v}" for r in reports for v in r["violations"]]
+    result = {
+        "table_rows": {name: table_rows.get(name) for name in (
+            models.DynamicPaymentURL.__tablename__,
+            models.RedirectTarget.__tablename__,
+            models.PaymentSession.__tablename__,
+        )},
+        "budget_ms": args.budget_ms,
+        "seqscan_rows": args.seqscan_rows,
+        "passed": not violations,
+        "violations": violations,
+        "cases": reports,
+    }
+    output = json.dumps(result, indent=2, default=str)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+    for violation in violations:
+        print(f"FAIL {violation}", file=sys.stderr)
+    sys.exit(1 if violations else 0)
+
+
+if __name__ == "__main__":
+    main()
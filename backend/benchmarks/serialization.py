@@ -0,0 +1,90 @@
+"""Per-request serialization cost of the hot payment responses.
+
+Compares the old path (dict + jsonable_encoder + stdlib json through
+JSONResponse), the orjson default response class, and the pre-encoded
+templates from app.core.responses with only session_id spliced in.
+No database or server needed.
+
+    python -m benchmarks.serialization --iterations 200000
+"""
+import argparse
+import json
+import timeit
+import uuid
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
+
+from app.core import responses
+
+LINK = "https://bank.example/pay/1?merchant=42&channel=sbp"
+
+
+def link_dict(session_id: str) -> dict:
+    return {
+        "success": True,
+        "session_id": session_id,
+        "link": LINK,
+        "message": "Ссылка создана",
+    }
+
+
+def qr_dict(session_id: str) -> dict:
+    return {
+        "success": True,
+        "qr_code": {
+            "url": responses.pay_url(session_id),
+            "session_id": session_id,
+            "image": f"/api/qr-code.svg?session={session_id}",
+        },
+        "message": "QR код сгенерирован",
+    }
+
+
+def cases(session_id: str) -> dict:
+    return {
+        "link_stdlib": lambda: JSONResponse(jsonable_encoder(link_dict(session_id))).body,
+        "link_orjson": lambda: ORJSONResponse(jsonable_encoder(link_dict(session_id))).body,
+        "link_template": lambda: Response(
+            responses.link_template(LINK).render(session_id), media_type="application/json"
+        ).body,
+        "qr_stdlib": lambda: JSONResponse(jsonable_encoder(qr_dict(session_id))).body,
+        "qr_orjson": lambda: ORJSONResponse(jsonable_encoder(qr_dict(session_id))).body,
+        "qr_template": lambda: Response(
+            responses.QR_TEMPLATE.render(session_id), media_type="application/json"
+        ).body,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    session_id = str(uuid.uuid4())
+    benchmarks = cases(session_id)
+
+    # Every variant must produce the same document
+    for kind in ("link", "qr"):
+        expected = json.loads(benchmarks[f"{kind}_stdlib"]())
+        for variant in ("orjson", "template"):
+            assert json.loads(benchmarks[f"{kind}_{variant}"]()) == expected, (kind, variant)
+
+    result = {}
+    for name, case in benchmarks.items():
+        best = min(timeit.repeat(case, number=args.iterations, repeat=args.repeat))
+        result[name] = {"ns_per_request": round(best / args.iterations * 1e9)}
+
+    for kind in ("link", "qr"):
+        result[f"{kind}_speedup"] = round(
+            result[f"{kind}_stdlib"]["ns_per_request"]
+            / result[f"{kind}_template"]["ns_per_request"],
+            1,
+        )
+
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,400 @@
+"""Reproducible HTTP load test of the whole gateway.
+
+Boots `uvicorn app.main:app` on a free port against the Postgres from the
+DB_* settings, or with --embedded against a throwaway cluster (needs the
+pgserver package). Applies migrations, seeds "bench-suite-*" redirect
+history, one active redirect split across two targets and round-the-clock
+working hours, then drives every scenario with a closed-loop profile: each
+of N clients sends its next request as soon as the previous one returns.
+The HTTP client comes from requirements-dev.txt.
+
+Prints one JSON document with the git commit, the run parameters and, per
+scenario and concurrency level, throughput, status counts and
+p50/p95/p99/max latency, so runs on two commits can be diffed directly.
+
+    python -m benchmarks.suite --embedded --workers 4 --concurrency 1,16,64 --duration 10
+    python -m benchmarks.suite --scenarios payment_link,health --output before.json
+    python -m benchmarks.suite --url http://127.0.0.1:8000 --token "$TOKEN"
+
+Against a shared database the previously active redirect and the working
+hours are restored at the end; seeded rows are removed with --cleanup.
+A server given with --url must run with RATE_LIMIT_PAYMENT_RATE=0, or the
+payment scenarios measure the rate limiter.
+The load generator is a single asyncio process, so keep an eye on its CPU
+at high concurrency: past that point it measures the client.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+PREFIX = "bench-suite-"
+
+# name -> (method, path, needs admin token)
+SCENARIOS = {
+    "health": ("GET", "/health", False),
+    "payment_link": ("GET", "/api/payment-link", False),
+    "generate_qr": ("GET", "/api/generate-qr", False),
+    "payment_status": ("GET", "/api/payment-status", False),
+    "session": ("POST", "/api/session?kind=link", False),
+    "pay_redirect": ("GET", "/pay?amount=1500", False),
+    "admin_dashboard": ("GET", "/api/admin/dashboard", True),
+    "admin_redirects": ("GET", "/api/admin/dynamic-redirects?limit=50", True),
+    "admin_working_hours": ("GET", "/api/admin/working-hours", True),
+}
+
+# Settings without defaults; only filled in for the embedded cluster
+EMBEDDED_SETTINGS = {
+    "DEBUG": "false",
+    "FRONTEND_URL": "http://127.0.0.1:3000",
+    "DOMAIN": "127.0.0.1",
+    "PROTOCOL": "http",
+    "ADMIN_USERNAME": "bench",
+    "ADMIN_PASSWORD": "!",
+    "JWT_SECRET_KEY": os.urandom(16).hex(),
+    "JWT_ALGORITHM": "HS256",
+    "JWT_EXPIRATION_MINUTES": "120",
+}
+
+
+def start_embedded() -> object:
+    try:
+        import pgserver
+    except ImportError:
+        sys.exit("--embedded needs the pgserver package: pip install pgserver")
+
+    server = pgserver.get_server(tempfile.mkdtemp(prefix="bench-pg-"), cleanup_mode="delete")
+    info = server.get_postmaster_info()
+    os.environ.update(
+        DB_HOST=str(info.socket_dir),
+        DB_PORT=str(info.port),
+        DB_NAME="postgres",
+        DB_USER="postgres",
+        DB_PASSWORD="",
+    )
+    for key, value in EMBEDDED_SETTINGS.items():
+        os.environ.setdefault(key, value)
+    return server
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def git_revision() -> dict:
+    def git(*args):
+        return subprocess.run(
+            ["git", *args], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+
+    try:
+        return {"commit": git("rev-parse", "HEAD"), "dirty": bool(git("status", "--porcelain"))}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+
+def seed(history: int) -> dict:
+    """Seed data and return what is needed to restore the previous state"""
+    from sqlalchemy import func, text
+
+    from app.api.schemas.payment_link import DynamicPaymentURLCreate, RedirectTargetCreate
+    from app.api.schemas.workhours import WorkingHoursUpdate
+    from app.db import crud, models
+    from app.db.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        previous = [url.id for url in crud.get_active_dynamic_urls(db)]
+        hours = [
+            WorkingHoursUpdate(
+                day_of_week=day.day_of_week,
+                work_start=day.work_start,
+                work_end=day.work_end,
+                is_enabled=day.is_enabled,
+                timezone=day.timezone or "Europe/Moscow",
+            )
+            for day in crud.get_all_working_hours(db)
+        ]
+
+        existing = db.query(func.count(models.DynamicPaymentURL.id)).filter(
+            models.DynamicPaymentURL.name.like(f"{PREFIX}history-%")
+        ).scalar()
+        if existing < history:
+            db.execute(
+                text(
+                    """
+                    INSERT INTO dynamic_payment_urls
+                        (name, target_url, valid_from, valid_until, is_active, auto_activate,
+                         created_at, supports_amount, amount_parameter)
+                    SELECT :prefix || g, 'https://bench.example/pay/' || g,
+                           now() - interval '2 days', now() - interval '1 day', false, false,
+                           now() - g * interval '1 second', true, 'sum'
+                    FROM generate_series(:start, :stop) AS g
+                    """
+                ),
+                {"prefix": f"{PREFIX}history-", "start": existing + 1, "stop": history},
+            )
+            db.commit()
+            db.execute(text("ANALYZE dynamic_payment_urls"))
+            db.commit()
+
+        crud.replace_working_hours(
+            db,
+            [WorkingHoursUpdate(day_of_week=day, work_start="00:00", work_end="23:59") for day in range(7)],
+        )
+        now = datetime.now(timezone.utc)
+        crud.create_dynamic_url(
+            db,
+            DynamicPaymentURLCreate(
+                name=f"{PREFIX}active",
+                target_url="https://bench.example/pay/active",
+                valid_from=now - timedelta(minutes=1),
+                valid_until=now + timedelta(days=1),
+                targets=[RedirectTargetCreate(target_url="https://bench.example/pay/split")],
+            ),
+        )
+        return {"previous": previous, "hours": hours}
+    finally:
+        db.close()
+
+
+def restore(state: dict, cleanup: bool) -> None:
+    from app.db import crud, models
+    from app.db.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        if state["hours"]:
+            crud.replace_working_hours(db, state["hours"])
+
+        if state["previous"]:
+            redirect = crud.get_dynamic_url(db, state["previous"][0])
+            if redirect and not redirect.is_active:
+                crud.toggle_redirect_status(db, redirect)
+        else:
+            crud.release_active_dynamic_url(db)
+            crud.notify_routing_changed(db)
+            db.commit()
+
+        if cleanup:
+            db.query(models.DynamicPaymentURL).filter(
+                models.DynamicPaymentURL.name.like(f"{PREFIX}%")
+            ).delete(synchronize_session=False)
+            crud.notify_routing_changed(db)
+            db.commit()
+    finally:
+        db.close()
+
+
+def admin_token() -> str:
+    from app.core.auth import create_access_token
+    from app.core.config import settings
+
+    return create_access_token({"sub": settings.ADMIN_USERNAME})
+
+
+def boot(port: int, workers: int, workdir: Path) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        PROMETHEUS_MULTIPROC_DIR=str(workdir / "prometheus"),
+        SNAPSHOT_FILE=str(workdir / "routing-snapshot.json"),
+        WORKERS=str(workers),
+        SERVER_TIMING_ENABLED="false",
+        PROFILE_SAMPLE_RATE="0",
+        # Every load client shares one IP; the per-client limit would cap the numbers
+        RATE_LIMIT_PAYMENT_RATE="0",
+        RATE_LIMIT_LOGIN_RATE="0",
+        RATE_LIMIT_FILE=str(workdir / "ratelimit"),
+    )
+    (workdir / "prometheus").mkdir()
+    log = open(workdir / "uvicorn.log", "wb")
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(workers), "--no-access-log", "--log-level", "warning",
+        ],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=log,
+        stderr=subprocess.STDOUT,
+    )
+
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            sys.exit(f"uvicorn exited with {server.returncode}, see {workdir / 'uvicorn.log'}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                return server
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    server.terminate()
+    sys.exit(f"uvicorn did not become healthy, see {workdir / 'uvicorn.log'}")
+
+
+def stop(server: subprocess.Popen) -> None:
+    server.terminate()
+    try:
+        server.wait(timeout=20)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+
+def percentile(ordered: list[float], p: float) -> float:
+    # nearest-rank
+    return ordered[max(math.ceil(p / 100 * len(ordered)) - 1, 0)]
+
+
+async def run_level(
+    base_url: str, scenario: str, token: str, concurrency: int, duration: float, warmup: float
+) -> dict:
+    method, path, needs_token = SCENARIOS[scenario]
+    headers = {"Authorization": f"Bearer {token}"} if needs_token else {}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    latencies: list[float] = []
+    statuses: dict[str, int] = {}
+    errors = 0
+
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=30) as client:
+        measure_from = time.perf_counter() + warmup
+        deadline = measure_from + duration
+
+        async def worker():
+            nonlocal errors
+            while True:
+                started = time.perf_counter()
+                if started >= deadline:
+                    return
+                try:
+                    status = str((await client.request(method, path)).status_code)
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                finished = time.perf_counter()
+                if started < measure_from:
+                    continue
+                latencies.append(finished - started)
+                statuses[status] = statuses.get(status, 0) + 1
+                if not status.isdigit() or int(status) >= 400:
+                    errors += 1
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    latencies.sort()
+    result = {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "rps": round(len(latencies) / duration, 1),
+        "errors": errors,
+        "status": statuses,
+    }
+    if latencies:
+        result.update(
+            {
+                f"{name}_ms": round(percentile(latencies, p) * 1000, 2)
+                for name, p in (("p50", 50), ("p95", 95), ("p99", 99), ("max", 100))
+            }
+        )
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", help="benchmark an already running gateway, skip boot and seed")
+    parser.add_argument("--token", default="", help="admin token for --url runs")
+    parser.add_argument("--embedded", action="store_true", help="throwaway Postgres via pgserver")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--concurrency", default="1,16,64")
+    parser.add_argument("--duration", type=float, default=10, help="measured seconds per level")
+    parser.add_argument("--warmup", type=float, default=2, help="unmeasured seconds per level")
+    parser.add_argument("--history", type=int, default=10_000, help="seeded history rows")
+    parser.add_argument("--cleanup", action="store_true", help="delete seeded rows afterwards")
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    scenarios = args.scenarios.split(",")
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    report = {
+        **git_revision(),
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "workers": None if args.url else args.workers,
+        "duration_s": args.duration,
+        "warmup_s": args.warmup,
+        "history_rows": None if args.url else args.history,
+        "results": [],
+    }
+
+    pg = server = state = None
+    with tempfile.TemporaryDirectory(prefix="bench-suite-") as workdir:
+        try:
+            if args.url:
+                base_url, token = args.url.rstrip("/"), args.token
+            else:
+                if args.embedded:
+                    pg = start_embedded()
+                subprocess.run(
+                    [sys.executable, "-m", "alembic", "upgrade", "head"],
+                    cwd=BACKEND_DIR, check=True, capture_output=True,
+                )
+                state = seed(args.history)
+                token = admin_token()
+                port = free_port()
+                server = boot(port, args.workers, Path(workdir))
+                base_url = f"http://127.0.0.1:{port}"
+
+            status = httpx.get(f"{base_url}/api/payment-status", timeout=10).json()
+            if not status.get("success"):
+                sys.exit(f"payment page is not serving links: {status}")
+
+            for scenario in scenarios:
+                for level in levels:
+                    result = asyncio.run(
+                        run_level(base_url, scenario, token, level, args.duration, args.warmup)
+                    )
+                    report["results"].append(result)
+                    print(
+                        f"{scenario} c={level}: {result['rps']} rps, "
+                        f"p99 {result.get('p99_ms')} ms, errors {result['errors']}",
+                        file=sys.stderr,
+                    )
+        finally:
+            if server is not None:
+                stop(server)
+            if state is not None:
+                restore(state, args.cleanup)
+            if pg is not None:
+                pg.cleanup()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,4 +4,8 @@ set -e
 alembic upgrade head
 echo "Migrations completed successfully!"
 
-uvicorn app.main:app --host 0.0.0.0 --port 8000 --workers 4
+# Метрики воркеров складываются в общий каталог; старые файлы от прошлого запуска удаляем
+export PROMETHEUS_MULTIPROC_DIR=${PROMETHEUS_MULTIPROC_DIR:-/tmp/prometheus}
+rm -rf "$PROMETHEUS_MULTIPROC_DIR" && mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
+uvicorn app.main:app --host 0.0.0.0 --port 8000 --workers ${WORKERS:-4} --timeout-graceful-shutdown 10
@@ -0,0 +1,59 @@
+import os
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+# Settings читаются при импорте app: значения по умолчанию для локального Postgres
+for key, value in {
+    "DEBUG": "false",
+    "FRONTEND_URL": "http://localhost:3000",
+    "DOMAIN": "localhost",
+    "PROTOCOL": "http",
+    "ADMIN_USERNAME": "admin",
+    "ADMIN_PASSWORD": "",
+    "JWT_SECRET_KEY": "test-secret",
+    "JWT_ALGORITHM": "HS256",
+    "JWT_EXPIRATION_MINUTES": "60",
+    "DB_HOST": "127.0.0.1",
+    "DB_PORT": "5432",
+    "DB_NAME": "payments",
+    "DB_USER": "postgres",
+    "DB_PASSWORD": "",
+    "RATE_LIMIT_PAYMENT_RATE": "0",
+    "RATE_LIMIT_LOGIN_RATE": "0",
+}.items():
+    os.environ.setdefault(key, value)
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.core import routing  # noqa: E402
+from app.core.session_buffer import buffer as session_buffer  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+@pytest.fixture
+def client():
+    # Без lifespan: проверка параметров не доходит до снапшота маршрутизации
+    return TestClient(app)
+
+
+@pytest.fixture
+def active_redirect(monkeypatch):
+    """Снапшот маршрутизации с одной открытой ссылкой id=7 и записью сессий в список"""
+    now = datetime.now(timezone.utc)
+    dynamic_url = routing.ActiveRedirect(
+        id=7,
+        name="test",
+        target_url="https://bank.example/pay",
+        valid_from=now - timedelta(hours=1),
+        valid_until=now + timedelta(hours=1),
+        supports_amount=True,
+        amount_parameter="sum",
+    )
+    snapshot = SimpleNamespace(schedule=SimpleNamespace(status=lambda: (True, "")))
+    recorded = []
+    monkeypatch.setattr(routing, "get_snapshot", lambda: snapshot)
+    monkeypatch.setattr(routing, "current_redirect", lambda: dynamic_url)
+    monkeypatch.setattr(session_buffer, "add", lambda *args: recorded.append(args))
+    return recorded
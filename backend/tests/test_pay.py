@@ -0,0 +1,32 @@
+from decimal import Decimal
+
+import pytest
+
+from app.core import session_token
+
+
+@pytest.mark.parametrize("amount", ["10000000000", "99999999999", "1e30"])
+def test_amount_above_numeric_column_is_rejected(client, amount):
+    response = client.get("/pay", params={"amount": amount}, follow_redirects=False)
+    assert response.status_code == 422
+
+
+@pytest.mark.parametrize("amount", ["123.456", "0.001"])
+def test_amount_with_more_than_two_decimal_places_is_rejected(client, amount):
+    response = client.get("/pay", params={"amount": amount}, follow_redirects=False)
+    assert response.status_code == 422
+
+
+def test_session_for_active_redirect_is_recorded_under_its_id(client, active_redirect):
+    token = session_token.issue(7, Decimal("150.50"))
+    response = client.get("/pay", params={"session": token}, follow_redirects=False)
+    assert response.status_code == 302
+    assert response.headers["location"] == "https://bank.example/pay?sum=150.5"
+    assert active_redirect[0][:2] == (token, "redirect")
+
+
+def test_session_issued_for_another_redirect_is_rejected(client, active_redirect):
+    response = client.get("/pay", params={"session": session_token.issue(6)}, follow_redirects=False)
+    assert response.status_code == 302
+    assert "/payment-error?type=expired" in response.headers["location"]
+    assert active_redirect == []
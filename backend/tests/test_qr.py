@@ -0,0 +1,29 @@
+from app.core import qr, responses, session_token
+
+
+def test_generate_qr_encodes_pay_url_with_its_session(client, active_redirect):
+    qr_code = client.get("/api/generate-qr").json()["qr_code"]
+    session_id = qr_code["session_id"]
+    assert session_token.verify(session_id).redirect_id == 7
+    assert qr_code["url"] == responses.pay_url(session_id)
+    assert qr_code["image"] == f"/api/qr-code.svg?session={session_id}"
+
+
+def test_qr_image_is_rendered_for_pay_url_with_session(client, active_redirect):
+    token = session_token.issue(7)
+    response = client.get("/api/qr-code.svg", params={"session": token})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/svg+xml"
+    assert response.headers["etag"] == f'"{qr.url_digest(responses.pay_url(token))}-300.svg"'
+
+
+def test_qr_image_requires_session(client, active_redirect):
+    assert client.get("/api/qr-code.svg").status_code == 422
+    assert client.get("/api/qr-code.svg", params={"session": "garbage"}).status_code == 400
+
+
+def test_qr_image_rejects_expired_or_foreign_session(client, active_redirect):
+    expired = session_token.issue(7, now=0)
+    assert client.get("/api/qr-code.svg", params={"session": expired}).status_code == 410
+    foreign = session_token.issue(6)
+    assert client.get("/api/qr-code.svg", params={"session": foreign}).status_code == 410
@@ -0,0 +1,56 @@
+import os
+import subprocess
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db import crud
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture
+def migrated_db():
+    """Пустая база, поднятая миграциями до head; удаляется после теста"""
+    name = f"test_routing_{uuid.uuid4().hex[:8]}"
+    admin = create_engine(settings.DATABASE_URL, isolation_level="AUTOCOMMIT")
+    try:
+        with admin.connect() as conn:
+            conn.execute(text(f'CREATE DATABASE "{name}"'))
+    except OperationalError:
+        pytest.skip("Postgres недоступен")
+
+    engine = None
+    try:
+        subprocess.run(
+            [sys.executable, "-m", "alembic", "upgrade", "head"],
+            cwd=BACKEND_DIR,
+            env=dict(os.environ, DB_NAME=name),
+            check=True,
+            capture_output=True,
+        )
+        engine = create_engine(settings.model_copy(update={"DB_NAME": name}).DATABASE_URL)
+        yield engine
+    finally:
+        if engine is not None:
+            engine.dispose()
+        with admin.connect() as conn:
+            conn.execute(text(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE)'))
+        admin.dispose()
+
+
+def test_first_mutation_after_migration_changes_version(migrated_db):
+    with Session(migrated_db) as db:
+        before = crud.get_routing_version(db)
+        crud.notify_routing_changed(db)
+        db.commit()
+        after = crud.get_routing_version(db)
+
+    assert before == 0
+    assert after == 1
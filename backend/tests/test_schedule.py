@@ -0,0 +1,50 @@
+from datetime import datetime, time
+from types import SimpleNamespace
+
+from app.core.config import MOSCOW_TZ
+from app.core.schedule import compile_schedule
+
+
+def interval(day_of_week: int, work_start: str, work_end: str, is_enabled: bool = True):
+    return SimpleNamespace(
+        day_of_week=day_of_week,
+        work_start=work_start,
+        work_end=work_end,
+        is_enabled=is_enabled,
+        timezone="Europe/Moscow",
+    )
+
+
+def at(hour: int, minute: int = 0) -> datetime:
+    return datetime.combine(datetime.now(MOSCOW_TZ).date(), time(hour, minute), tzinfo=MOSCOW_TZ)
+
+
+def test_weekday_keeps_every_interval():
+    rows = [interval(day, start, end) for day in range(7) for start, end in (("10:00", "12:00"), ("14:00", "16:00"))]
+    schedule = compile_schedule(rows, [], MOSCOW_TZ)
+
+    assert schedule.status(at(11))[0]
+    assert schedule.status(at(15))[0]
+    is_open, message = schedule.status(at(13))
+    assert not is_open
+    assert message == "Рабочее время: 10:00 - 12:00, 14:00 - 16:00"
+    assert schedule.next_change(at(13)) == at(14)
+
+
+def test_end_is_exclusive_and_equal_bounds_stay_closed():
+    rows = [interval(day, "10:00", "12:00") for day in range(7)]
+    rows += [interval(day, "18:00", "18:00") for day in range(7)]
+    schedule = compile_schedule(rows, [], MOSCOW_TZ)
+
+    assert schedule.status(at(10))[0]
+    assert not schedule.status(at(12))[0]
+    assert not schedule.status(at(18))[0]
+    assert schedule.status(at(18))[1] == "Рабочее время: 10:00 - 12:00"
+
+
+def test_equal_bounds_alone_close_the_day():
+    schedule = compile_schedule([interval(day, "09:00", "09:00") for day in range(7)], [], MOSCOW_TZ)
+
+    is_open, message = schedule.status(at(9))
+    assert not is_open
+    assert message.endswith("не рабочий день")
@@ -0,0 +1,24 @@
+from decimal import Decimal
+
+import pytest
+from pydantic import ValidationError
+
+from app.core import session_token
+from app.core.config import Settings
+
+
+def test_roundtrip_keeps_redirect_and_amount():
+    claims = session_token.verify(session_token.issue(42, Decimal("150.50")))
+    assert claims.redirect_id == 42
+    assert claims.amount == Decimal("150.50")
+
+
+def test_amount_that_does_not_fit_the_token_raises_value_error():
+    with pytest.raises(ValueError):
+        session_token.issue(42, Decimal("1e30"))
+
+
+@pytest.mark.parametrize("ttl", [0, 65536])
+def test_ttl_outside_two_bytes_is_rejected_by_settings(ttl):
+    with pytest.raises(ValidationError):
+        Settings(SESSION_TOKEN_TTL=ttl)
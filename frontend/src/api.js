@@ -4,6 +4,7 @@ const API_URL = process.env.REACT_APP_API_URL || 'http://localhost:8000';
 
 const api = axios.create({
   baseURL: API_URL,
+  withCredentials: true,
   headers: {
     'Content-Type': 'application/json'
   }
@@ -60,23 +61,54 @@ export const logout = async () => {
   return response.data;
 };
 
-export const generateQR = async () => {
-  const response = await axios.get(`${API_URL}/api/generate-qr`);
+// Статус оплаты общий для всех и кешируется nginx, session_id выдаётся отдельно
+const getPaymentStatus = async () => {
+  const response = await axios.get(`${API_URL}/api/payment-status`);
   return response.data;
 };
 
-export const getPaymentLink = async () => {
-  const response = await axios.get(`${API_URL}/api/payment-link`);
+const createSession = async (kind) => {
+  const response = await axios.post(`${API_URL}/api/session`, null, { params: { kind } });
   return response.data;
 };
 
+// Ссылка и QR ведут через /pay с подписанным session_id: переход записывается
+// под той же сессией, что и показ страницы, а просроченную сессию сервер отклонит
+const payUrl = (sessionId) => `${API_URL}/pay?session=${encodeURIComponent(sessionId)}`;
+
+export const generateQR = async () => {
+  const [status, session] = await Promise.all([getPaymentStatus(), createSession('qr')]);
+  if (!status.success) return status;
+  if (!session.success) return session;
+  return { success: true, qr_code: { url: payUrl(session.session_id), session_id: session.session_id } };
+};
+
+export const subscribePaymentEvents = (onState) => {
+  const source = new EventSource(`${API_URL}/api/payment-events`);
+  source.addEventListener('state', (event) => onState(JSON.parse(event.data)));
+  return () => source.close();
+};
+
+export const getPaymentLink = async () => {
+  const [status, session] = await Promise.all([getPaymentStatus(), createSession('link')]);
+  if (!status.success) return status;
+  if (!session.success) return session;
+  return { success: true, session_id: session.session_id, link: payUrl(session.session_id) };
+};
+
 export const updateDynamicRedirect = async (data) => {
   const response = await api.post('/api/admin/dynamic-redirect', data);
   return response.data;
 };
 
-export const getAllRedirects = async () => {
-  const response = await api.get('/api/admin/dynamic-redirects');
+export const getAllRedirects = async (params = {}) => {
+  const response = await api.get('/api/admin/dynamic-redirects', { params });
+  return { items: response.data, nextCursor: response.headers['x-next-cursor'] || null };
+};
+
+// Браузер сам переспрашивает с If-None-Match и подставляет тело из кеша на 304
+export const getDashboard = async () => {
+  const response = await api.get('/api/admin/dashboard');
   return response.data;
 };
 
@@ -90,6 +122,11 @@ export const updateWorkingHours = async (data) => {
   return response.data;
 };
 
+export const updateWeekWorkingHours = async (days) => {
+  const response = await api.put('/api/admin/working-hours/bulk', { days });
+  return response.data;
+};
+
 export const getAllWorkingHours = async () => {
   const response = await api.get('/api/admin/working-hours');
   return response.data;
@@ -2,16 +2,18 @@ import React, { useState, useEffect } from 'react';
 import {
     updateDynamicRedirect,
     getAllRedirects,
-    getCurrentRedirect,
-    updateWorkingHours,
-    getAllWorkingHours,
+    getDashboard,
+    updateWeekWorkingHours,
     toggleRedirectStatus,
     logout, deleteRedirect
 } from '../../api';
 import './AdminPanel.css';
 
+const DEFAULT_INTERVAL = { work_start: '10:00', work_end: '21:00' };
+
 const AdminPanel = () => {
   const [redirects, setRedirects] = useState([]);
+  const [redirectsCursor, setRedirectsCursor] = useState(null);
   const [currentRedirect, setCurrentRedirect] = useState(null);
   const [workingHours, setWorkingHours] = useState({});
   const [loading, setLoading] = useState(false);
@@ -44,34 +46,26 @@ const AdminPanel = () => {
 
   const fetchData = async () => {
     try {
-      const [currentData, redirectsData, hoursData] = await Promise.all([
-        getCurrentRedirect(),
-        getAllRedirects(),
-        getAllWorkingHours(),
-      ]);
-
-      if (currentData.success) {
-        setCurrentRedirect(currentData.redirect);
-      }
+      const data = await getDashboard();
 
-      setRedirects(redirectsData);
+      setCurrentRedirect(data.current_redirect);
+      setRedirects(data.redirects);
+      setRedirectsCursor(data.next_cursor);
 
+      // API отдаёт по строке на интервал, у дня их может быть несколько
       const hoursObj = {};
-      hoursData.forEach(hour => {
-        hoursObj[hour.day_of_week] = {
-          work_start: hour.work_start,
-          work_end: hour.work_end,
-          is_enabled: hour.is_enabled
-        };
+      data.working_hours.forEach(hour => {
+        const day = hoursObj[hour.day_of_week] || { is_enabled: false, intervals: [] };
+        day.is_enabled = day.is_enabled || hour.is_enabled;
+        day.intervals.push({ work_start: hour.work_start, work_end: hour.work_end });
+        hoursObj[hour.day_of_week] = day;
       });
-      setWorkingHours(hoursObj);
 
       for (let i = 0; i < 7; i++) {
         if (!hoursObj[i]) {
           hoursObj[i] = {
-            work_start: '10:00',
-            work_end: '21:00',
-            is_enabled: true
+            is_enabled: true,
+            intervals: [{ ...DEFAULT_INTERVAL }]
           };
         }
       }
@@ -100,6 +94,21 @@ const AdminPanel = () => {
     }
   };
 
+  const handleLoadMoreRedirects = async () => {
+    setLoading(true);
+    setError(null);
+
+    try {
+      const data = await getAllRedirects({ cursor: redirectsCursor });
+      setRedirects((prev) => [...prev, ...data.items]);
+      setRedirectsCursor(data.nextCursor);
+    } catch (err) {
+      setError('Ошибка при загрузке истории');
+    } finally {
+      setLoading(false);
+    }
+  };
+
   const handleToggleRedirect = async (redirectId, isActive) => {
     setLoading(true);
     setError(null);
@@ -159,18 +168,67 @@ const AdminPanel = () => {
     }
   };
 
+  const updateDay = (idx, changes) => {
+    setWorkingHours({
+      ...workingHours,
+      [idx]: {
+        ...workingHours[idx],
+        ...changes
+      }
+    });
+  };
+
+  const updateInterval = (idx, position, changes) => {
+    updateDay(idx, {
+      intervals: workingHours[idx].intervals.map((interval, i) =>
+        i === position ? { ...interval, ...changes } : interval
+      )
+    });
+  };
+
+  const addInterval = (idx) => {
+    updateDay(idx, { intervals: [...workingHours[idx].intervals, { ...DEFAULT_INTERVAL }] });
+  };
+
+  const removeInterval = (idx, position) => {
+    updateDay(idx, { intervals: workingHours[idx].intervals.filter((_, i) => i !== position) });
+  };
+
+  // Строка API на каждый интервал; сохранённый день заменяется на сервере целиком
+  const dayRows = (idx) =>
+    workingHours[idx].intervals.map(interval => ({
+      day_of_week: idx,
+      work_start: interval.work_start,
+      work_end: interval.work_end,
+      is_enabled: workingHours[idx].is_enabled
+    }));
+
   const handleUpdateWorkingHours = async (dayOfWeek) => {
     setLoading(true);
     setError(null);
     setSuccess(null);
 
     try {
-      const data = await updateWorkingHours({
-        day_of_week: dayOfWeek,
-        work_start: workingHours[dayOfWeek].work_start,
-        work_end: workingHours[dayOfWeek].work_end,
-        is_enabled: workingHours[dayOfWeek].is_enabled
-      });
+      const data = await updateWeekWorkingHours(dayRows(dayOfWeek));
+
+      if (data.success) {
+        setSuccess(data.message);
+        fetchData();
+      }
+    } catch (err) {
+      setError(err.response?.data?.detail || 'Ошибка при обновлении рабочего времени');
+    } finally {
+      setLoading(false);
+    }
+  };
+
+  const handleUpdateWeekWorkingHours = async () => {
+    setLoading(true);
+    setError(null);
+    setSuccess(null);
+
+    try {
+      const data = await updateWeekWorkingHours(days.flatMap((_, idx) => dayRows(idx)));
 
       if (data.success) {
         setSuccess(data.message);
@@ -301,6 +359,7 @@ const AdminPanel = () => {
                 <h3>➕ Добавить новую ссылку на оплату</h3>
                 <p className="section-description">
                   Когда вы добавляете новую ссылку, все старые ссылки автоматически деактивируются.
+                  Если дата начала в будущем, ссылка будет запланирована и включится сама в указанное время.
                 </p>
 
                 <div className="form-group">
@@ -374,7 +433,7 @@ const AdminPanel = () => {
                         onClick={() => handleToggleRedirect(redirect.id, redirect.is_active)}
                         disabled={loading}
                       >
-                        {redirect.is_active ? 'АКТИВНА' : 'НЕАКТИВНА'}
+                        {redirect.is_active ? 'АКТИВНА' : (redirect.auto_activate ? 'ЗАПЛАНИРОВАНА' : 'НЕАКТИВНА')}
                       </button>
                       <div className="card-actions-top-right">
                         <button
@@ -404,6 +463,16 @@ const AdminPanel = () => {
                   ))}
                 </div>
               )}
+
+              {redirectsCursor && (
+                <button
+                  className="btn btn-primary"
+                  onClick={handleLoadMoreRedirects}
+                  disabled={loading}
+                >
+                  Показать ещё
+                </button>
+              )}
             </div>
           )}
 
@@ -423,59 +492,56 @@ const AdminPanel = () => {
                         <input
                           type="checkbox"
                           checked={workingHours[idx]?.is_enabled || false}
-                          onChange={(e) => {
-                            setWorkingHours({
-                              ...workingHours,
-                              [idx]: {
-                                ...workingHours[idx],
-                                is_enabled: e.target.checked
-                              }
-                            });
-                          }}
+                          onChange={(e) => updateDay(idx, { is_enabled: e.target.checked })}
                         />
                         <span className="toggle-slider"></span>
                       </label>
                     </div>
 
-                    <div className="hours-inputs">
-                      <div className="time-input-group">
-                        <label>Начало</label>
-                        <input
-                          type="time"
-                          value={workingHours[idx]?.work_start || '10:00'}
-                          onChange={(e) => {
-                            setWorkingHours({
-                              ...workingHours,
-                              [idx]: {
-                                ...workingHours[idx],
-                                work_start: e.target.value
-                              }
-                            });
-                          }}
-                          disabled={!workingHours[idx]?.is_enabled}
-                          className="form-input"
-                        />
-                      </div>
-
-                      <div className="time-input-group">
-                        <label>Конец</label>
-                        <input
-                          type="time"
-                          value={workingHours[idx]?.work_end || '21:00'}
-                          onChange={(e) => {
-                            setWorkingHours({
-                              ...workingHours,
-                              [idx]: {
-                                ...workingHours[idx],
-                                work_end: e.target.value
-                              }
-                            });
-                          }}
-                          disabled={!workingHours[idx]?.is_enabled}
-                          className="form-input"
-                        />
+                    {(workingHours[idx]?.intervals || []).map((interval, position) => (
+                      <div key={position} className="hours-inputs">
+                        <div className="time-input-group">
+                          <label>Начало</label>
+                          <input
+                            type="time"
+                            value={interval.work_start}
+                            onChange={(e) => updateInterval(idx, position, { work_start: e.target.value })}
+                            disabled={!workingHours[idx]?.is_enabled}
+                            className="form-input"
+                          />
+                        </div>
+
+                        <div className="time-input-group">
+                          <label>Конец</label>
+                          <input
+                            type="time"
+                            value={interval.work_end}
+                            onChange={(e) => updateInterval(idx, position, { work_end: e.target.value })}
+                            disabled={!workingHours[idx]?.is_enabled}
+                            className="form-input"
+                          />
+                        </div>
+
+                        {workingHours[idx].intervals.length > 1 && (
+                          <button
+                            onClick={() => removeInterval(idx, position)}
+                            disabled={loading || !workingHours[idx]?.is_enabled}
+                            className="btn btn-secondary"
+                          >
+                            Удалить
+                          </button>
+                        )}
                       </div>
+                    ))}
 
+                    <div className="hours-actions">
+                      <button
+                        onClick={() => addInterval(idx)}
+                        disabled={loading || !workingHours[idx]?.is_enabled}
+                        className="btn btn-secondary"
+                      >
+                        + Интервал
+                      </button>
                       <button
                         onClick={() => handleUpdateWorkingHours(idx)}
                         disabled={loading}
@@ -487,6 +553,14 @@ const AdminPanel = () => {
                   </div>
                 ))}
               </div>
+
+              <button
+                onClick={handleUpdateWeekWorkingHours}
+                disabled={loading}
+                className="btn btn-primary btn-large"
+              >
+                Сохранить всю неделю
+              </button>
             </div>
           )}
         </div>
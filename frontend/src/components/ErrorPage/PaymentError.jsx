@@ -53,6 +53,22 @@ const PaymentError = () => {
           ]
         };
 
+      case 'expired':
+        return {
+          icon: '⌛',
+          title: 'Сессия истекла',
+          description: decodeURIComponent(message) || 'Время сессии оплаты истекло. Обновите страницу.',
+          gradient: 'linear-gradient(135deg, #667eea 0%, #764ba2 100%)',
+          showTime: false,
+          buttons: [
+            {
+              text: '↻ Обновить',
+              action: () => navigate('/'),
+              primary: false
+            }
+          ]
+        };
+
       case 'error':
         return {
           icon: '❌',
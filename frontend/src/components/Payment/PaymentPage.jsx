@@ -1,13 +1,12 @@
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect, useCallback, useRef } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { QRCodeSVG } from 'qrcode.react';
-import { generateQR, getPaymentLink } from '../../api';
+import { generateQR, getPaymentLink, subscribePaymentEvents } from '../../api';
 import './PaymentPage.css';
 import sbpIcon from '../../assets/SBP.png';
 
 const PaymentPage = () => {
   const navigate = useNavigate();
-  const SESSION_DURATION = 5 * 60;
   const PAGE_SESSION_DURATION = 5 * 60;
 
   const [sessionId] = useState(() => {
@@ -19,9 +18,9 @@ const PaymentPage = () => {
   const [paymentLink, setPaymentLink] = useState(null);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
-  const [qrTimeLeft, setQrTimeLeft] = useState(null);
-  const [linkTimeLeft, setLinkTimeLeft] = useState(null);
   const [showQR, setShowQR] = useState(false);
+  const showQRRef = useRef(false);
+  const linkRef = useRef(null);
 
   const formatTime = (seconds) => {
     const mins = Math.floor(seconds / 60);
@@ -30,16 +29,8 @@ const PaymentPage = () => {
   };
 
   useEffect(() => {
-    if (pageTimeLeft === 0) {
-      window.location.reload();
-      return;
-    }
-    const timer = setInterval(() => {
-      setPageTimeLeft((prev) => (prev > 0 ? prev - 1 : 0));
-    }, 1000);
-    return () => clearInterval(timer);
-  }, [pageTimeLeft]);
-
+    showQRRef.current = showQR;
+  }, [showQR]);
 
   const autoRefreshQR = useCallback(async () => {
     console.log('🔄 Автообновление QR-кода...');
@@ -52,11 +43,10 @@ const PaymentPage = () => {
       }
 
       setQrData(data.qr_code);
-      setQrTimeLeft(SESSION_DURATION);
     } catch (err) {
       console.error('Ошибка автообновления QR:', err);
     }
-  }, [SESSION_DURATION, navigate]);
+  }, [navigate]);
 
   const autoRefreshLink = useCallback(async () => {
     console.log('🔄 Автообновление ссылки...');
@@ -69,11 +59,44 @@ const PaymentPage = () => {
       }
 
       setPaymentLink(data);
-      setLinkTimeLeft(SESSION_DURATION);
     } catch (err) {
       console.error('Ошибка автообновления ссылки:', err);
     }
-  }, [SESSION_DURATION, navigate]);
+  }, [navigate]);
+
+  const renewSession = useCallback(() => {
+    autoRefreshLink();
+    if (showQRRef.current) {
+      autoRefreshQR();
+    }
+  }, [autoRefreshLink, autoRefreshQR]);
+
+  // Сервер принимает сессию PAGE_SESSION_DURATION секунд. Таймер только отсчитывает
+  // срок: новая сессия берётся по действию пользователя, а не запросом из каждой вкладки
+  const expired = pageTimeLeft === 0;
+
+  useEffect(() => {
+    if (pageTimeLeft === 0) return;
+    const timer = setInterval(() => {
+      setPageTimeLeft((prev) => (prev > 0 ? prev - 1 : 0));
+    }, 1000);
+    return () => clearInterval(timer);
+  }, [pageTimeLeft]);
+
+  // Сервер присылает состояние только при изменении: закрытие, смена реквизитов
+  useEffect(() => {
+    return subscribePaymentEvents((state) => {
+      if (!state.open) {
+        navigate(`/payment-error?type=${state.error}&message=${encodeURIComponent(state.message)}`);
+        return;
+      }
+      if (linkRef.current !== null && linkRef.current !== state.link) {
+        renewSession();
+        setPageTimeLeft(PAGE_SESSION_DURATION);
+      }
+      linkRef.current = state.link;
+    });
+  }, [navigate, renewSession, PAGE_SESSION_DURATION]);
 
   useEffect(() => {
     const fetchPaymentLink = async () => {
@@ -89,7 +112,6 @@ const PaymentPage = () => {
         }
 
         setPaymentLink(data);
-        setLinkTimeLeft(SESSION_DURATION);
       } catch (err) {
         setError('Ошибка при создании ссылки');
         console.error(err);
@@ -98,9 +120,17 @@ const PaymentPage = () => {
       }
     };
     fetchPaymentLink();
-  }, [SESSION_DURATION, navigate]);
+  }, [navigate]);
 
   const handleOpenPayment = async () => {
+    if (expired) {
+      // Новая ссылка открывается следующим нажатием: окно после await блокируют браузеры
+      setLoading(true);
+      await autoRefreshLink();
+      setPageTimeLeft(PAGE_SESSION_DURATION);
+      setLoading(false);
+      return;
+    }
     if (paymentLink?.link) {
       window.open(paymentLink.link, '_blank');
     }
@@ -109,6 +139,10 @@ const PaymentPage = () => {
   const handleGenerateQR = async () => {
     setLoading(true);
     setError(null);
+    if (expired) {
+      autoRefreshLink();
+      setPageTimeLeft(PAGE_SESSION_DURATION);
+    }
     try {
       const data = await generateQR();
 
@@ -119,7 +153,6 @@ const PaymentPage = () => {
       }
 
       setQrData(data.qr_code);
-      setQrTimeLeft(SESSION_DURATION);
       setShowQR(true);
     } catch (err) {
       setError('Ошибка при генерации QR-кода');
@@ -129,37 +162,15 @@ const PaymentPage = () => {
     }
   };
 
-  useEffect(() => {
-    if (qrTimeLeft === null || qrTimeLeft < 0) return;
-    if (qrTimeLeft === 0) {
-      autoRefreshQR();
-      return;
-    }
-    const timer = setInterval(() => {
-      setQrTimeLeft((prev) => (prev > 0 ? prev - 1 : 0));
-    }, 1000);
-    return () => clearInterval(timer);
-  }, [qrTimeLeft, autoRefreshQR]);
-
-  useEffect(() => {
-    if (linkTimeLeft === null || linkTimeLeft < 0) return;
-    if (linkTimeLeft === 0) {
-      autoRefreshLink();
-      return;
-    }
-    const timer = setInterval(() => {
-      setLinkTimeLeft((prev) => (prev > 0 ? prev - 1 : 0));
-    }, 1000);
-    return () => clearInterval(timer);
-  }, [linkTimeLeft, autoRefreshLink]);
-
   return (
     <div className="payment-page">
       <div className="payment-container">
         <div className="header">
           <h1>Оплата через СБП</h1>
           <p className="subtitle">Сессия: {sessionId}</p>
-          <p className="subtitle">Завершите платеж в течении: {formatTime(pageTimeLeft)}</p>
+          <p className="subtitle">
+            {expired ? 'Сессия истекла, обновите её, чтобы продолжить' : `Завершите платеж в течении: ${formatTime(pageTimeLeft)}`}
+          </p>
         </div>
 
         <div className="primary-payment">
@@ -173,7 +184,7 @@ const PaymentPage = () => {
             onClick={handleOpenPayment}
             disabled={loading || !paymentLink}
           >
-            {loading ? '⏳ Загрузка...' : (
+            {loading ? '⏳ Загрузка...' : expired ? '↻ Обновить сессию' : (
               <>
                 <img src={sbpIcon} alt="" className="btn-icon" />
                 Выбрать банк
@@ -193,15 +204,10 @@ const PaymentPage = () => {
             {showQR ? 'Обновить QR-код' : 'Показать QR-код для сканирования'}
           </button>
 
-          {qrData && showQR && (
+          {qrData && showQR && !expired && (
             <div className="qr-display">
               <div className="qr-content">
-                <QRCodeSVG
-                  value={qrData.url}
-                  size={200}
-                  level="H"
-                  includeMargin={true}
-                />
+                <QRCodeSVG value={qrData.url} size={200} level="H" includeMargin role="img" aria-label="QR-код для оплаты" />
                 <p className="qr-instruction">
                   Отсканируйте камерой телефона
                 </p>
@@ -210,7 +216,7 @@ const PaymentPage = () => {
                     <div className="warning-content">
                       <h3>ВАЖНО!</h3>
                       <p>
-                        <strong>QR-код обновляется каждые 5 минут, оплата по истёкшим реквизитам может привести к потере средств.</strong>
+                        <strong>QR-код обновляется автоматически при смене реквизитов и действует 5 минут, оплата по истёкшим реквизитам может привести к потере средств.</strong>
                       </p>
                     </div>
                   </div>